@@ -1,15 +1,69 @@
-import matplotlib.pyplot as plt
-from matplotlib_venn import venn2, venn3
-import re # Needed for stripping color codes in menu width calculation
+import time
+_MODULE_LOAD_START = time.perf_counter() # For the --startup-check budget
 
-# pip install supervenn  # Uncomment and run if you don't have supervenn
-try:
-    from supervenn import supervenn
-    SUPERVENN_AVAILABLE = True
-except ImportError:
-    SUPERVENN_AVAILABLE = False
-    print("Warning: 'supervenn' library not found. Visualization for 4-5 sets will be unavailable.")
-    print("You can install it using: pip install supervenn")
+import re # Needed for stripping color codes in menu width calculation
+import argparse
+import csv
+import json
+import os
+import sys
+import weakref
+from array import array
+from collections import Counter, OrderedDict
+from functools import wraps
+from heapq import nlargest
+from itertools import islice
+from types import MappingProxyType
+
+# --- Lazy Imports ---
+# matplotlib, matplotlib-venn, supervenn and NumPy are imported on first use only, so
+# text-only set math and `import app` from other programs start quickly. Functions that
+# draw call load_plotting(); the bitmap engine calls numpy_available().
+
+plt = venn2 = venn3 = None
+supervenn = None
+np = None
+_optional_checked = set()
+
+STARTUP_BUDGET_SECONDS = 0.15 # Import + argument parsing for the text-only path
+
+def load_plotting():
+    """Imports matplotlib and matplotlib-venn the first time a diagram is requested."""
+    global plt, venn2, venn3
+    if plt is None:
+        import matplotlib
+        if RENDER_SETTINGS["headless"]:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as pyplot
+        from matplotlib_venn import venn2 as _venn2, venn3 as _venn3
+        plt, venn2, venn3 = pyplot, _venn2, _venn3
+    return plt
+
+def supervenn_available():
+    """Imports supervenn on first use; warns once if it is missing."""
+    global supervenn
+    if "supervenn" not in _optional_checked:
+        _optional_checked.add("supervenn")
+        # pip install supervenn  # Uncomment and run if you don't have supervenn
+        try:
+            from supervenn import supervenn as _supervenn
+            supervenn = _supervenn
+        except ImportError:
+            print("Warning: 'supervenn' library not found. Visualization for 4-5 sets will be unavailable.")
+            print("You can install it using: pip install supervenn")
+    return supervenn is not None
+
+def numpy_available():
+    """Imports NumPy (needed only by the bitmap set engine) on first use."""
+    global np
+    if "numpy" not in _optional_checked:
+        _optional_checked.add("numpy")
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np is not None
 
 # --- ANSI Color Codes ---
 RESET = "\033[0m"
@@ -34,29 +88,489 @@ HIGHLIGHT_SYMM_DIFF_A = '#66B2FF'  # Light Blue for A part of symm diff
 HIGHLIGHT_SYMM_DIFF_B = '#99FF99'  # Light Green for B part of symm diff
 HIGHLIGHT_COMPLEMENT = '#D3D3D3'   # Light Grey for complement
 
+# --- Profiling ---
+# --profile times every stage of an operation (parsing, set operations, region
+# computation, plot layout, rendering) and records its peak memory via tracemalloc, plus
+# counters such as elements processed and regions computed. Each menu operation emits one
+# JSON trace record; a per-stage summary is printed at the end of the session. When
+# profiling is off, stage() returns a shared no-op context manager and count() returns
+# immediately, so the instrumentation costs one attribute check per call.
+
+tracemalloc = None # Imported by Profiler.enable()
+
+class _Stage:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._pop()
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """Collects per-stage wall time, peak memory and counters for --profile."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.record = None     # Trace record of the operation in progress
+        self.totals = {}       # stage -> [calls, seconds, self seconds, max peak bytes]
+        self.counters = Counter()
+        self.operations = 0
+        self._stack = []       # [name, start time, start memory, child peak, child seconds, trace entry]
+
+    def enable(self, trace_path=None):
+        """Starts profiling; trace records go to `trace_path` (JSON lines) or stdout."""
+        global tracemalloc
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+        self.trace_path = trace_path
+
+    def disable(self):
+        if self.enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+
+    def stage(self, name):
+        """Context manager timing one stage (a no-op when profiling is off)."""
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def count(self, name, amount=1):
+        """Adds `amount` to a counter of the current operation and of the session."""
+        if not self.enabled:
+            return
+        self.counters[name] += amount
+        if self.record is not None:
+            self.record["counters"][name] = self.record["counters"].get(name, 0) + amount
+
+    def begin(self, operation):
+        """Starts the trace record of one operation (e.g. a menu choice)."""
+        if not self.enabled:
+            return
+        self.end()
+        self.record = {"operation": operation, "start": time.time(), "stages": [], "counters": {}}
+        self._cache_start = (RESULT_CACHE.hits, RESULT_CACHE.misses)
+        self._push(None)
+
+    def end(self):
+        """Finishes the current operation and emits its JSON trace record."""
+        if not self.enabled or self.record is None:
+            return
+        seconds, _, peak = self._pop()
+        record, self.record = self.record, None
+        record.update(seconds=round(seconds, 6), peak_bytes=peak)
+        record["counters"]["cache_hits"] = RESULT_CACHE.hits - self._cache_start[0]
+        record["counters"]["cache_misses"] = RESULT_CACHE.misses - self._cache_start[1]
+        self.operations += 1
+        line = json.dumps(record, default=str)
+        if self.trace_path:
+            with open(self.trace_path, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(f"{CYAN}[profile] {line}{RESET}")
+
+    def _push(self, name):
+        if self._stack: # Fold the peak so far into the parent before resetting it
+            self._stack[-1][3] = max(self._stack[-1][3], tracemalloc.get_traced_memory()[1])
+        entry = None
+        if name is not None and self.record is not None: # Listed in start order, filled in by _pop()
+            entry = {"stage": name, "depth": len(self._stack) - 1}
+            self.record["stages"].append(entry)
+        tracemalloc.reset_peak()
+        self._stack.append([name, time.perf_counter(), tracemalloc.get_traced_memory()[0], 0, 0.0, entry])
+
+    def _pop(self):
+        name, start, start_memory, child_peak, child_seconds, entry = self._stack.pop()
+        seconds = time.perf_counter() - start
+        peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+        if self._stack:
+            self._stack[-1][3] = max(self._stack[-1][3], peak)
+            self._stack[-1][4] += seconds
+        peak_bytes = max(peak - start_memory, 0)
+        if name is not None:
+            totals = self.totals.setdefault(name, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += seconds - child_seconds
+            totals[3] = max(totals[3], peak_bytes)
+            if entry is not None:
+                entry.update(seconds=round(seconds, 6), self_seconds=round(seconds - child_seconds, 6),
+                             peak_bytes=peak_bytes)
+        return seconds, child_seconds, peak_bytes
+
+    def summary(self):
+        """Formats the per-stage totals and counters of the session."""
+        lines = [f"{BOLD}{CYAN}Profile summary ({self.operations} operation(s)){RESET}",
+                 f"  {'Stage':<24}{'Calls':>8}{'Total s':>12}{'Self s':>12}{'Peak MiB':>12}"]
+        for name, (calls, seconds, self_seconds, peak) in sorted(self.totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {name:<24}{calls:>8}{seconds:>12.4f}{self_seconds:>12.4f}{peak / 2**20:>12.2f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name}: {value:,}")
+        if self.trace_path:
+            lines.append(f"  Trace records written to {self.trace_path}")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
+
+def profiled(stage_name):
+    """Decorator that runs the function as a profiler stage when profiling is on."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with _Stage(PROFILER, stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# --- Element Dictionary ---
+# With --strings, elements are arbitrary tokens (user IDs, SKUs, hostnames). Every token
+# is interned once into a dense integer ID by a single dictionary shared by U and all
+# working sets, so operations, caches, bitmaps, sketches, shards and session files all
+# work on compact ints. IDs are decoded back to strings only for display.
+
+ELEMENT_DICTIONARY = None # ElementDictionary while --strings is active
+
+
+class ElementDictionary:
+    """Two-way mapping between string tokens and dense integer IDs (0, 1, 2, ...)."""
+
+    __slots__ = ("ids", "strings")
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = {token: id_ for id_, token in enumerate(self.strings)}
+
+    def encode(self, token):
+        """Returns the ID of `token`, assigning the next free ID to a new token."""
+        id_ = self.ids.get(token)
+        if id_ is None:
+            id_ = self.ids[token] = len(self.strings)
+            self.strings.append(token)
+        return id_
+
+    def encode_all(self, tokens):
+        get = self.ids.get
+        return [id_ if (id_ := get(token)) is not None else self.encode(token) for token in tokens]
+
+    def decode(self, id_):
+        return self.strings[id_]
+
+    def decode_set(self, ids):
+        """Returns the set of strings for a set of IDs."""
+        return {self.strings[id_] for id_ in ids}
+
+    def __len__(self):
+        return len(self.strings)
+
+
+def enable_element_dictionary(strings=()):
+    """Switches input parsing to string tokens, optionally seeding the dictionary."""
+    global ELEMENT_DICTIONARY
+    ELEMENT_DICTIONARY = ElementDictionary(strings)
+    return ELEMENT_DICTIONARY
+
+def parse_elements(tokens):
+    """Converts input tokens to elements: ints, or dictionary IDs in --strings mode."""
+    if ELEMENT_DICTIONARY is None:
+        return [int(token) for token in tokens]
+    return ELEMENT_DICTIONARY.encode_all(tokens)
+
+def display_element(element):
+    """repr() of an element as the user entered it (decoding dictionary IDs)."""
+    return repr(element if ELEMENT_DICTIONARY is None else ELEMENT_DICTIONARY.strings[element])
+
+def element_hint():
+    return "space-separated integers" if ELEMENT_DICTIONARY is None else "space-separated values"
+
 # --- Helper Functions ---
 
+@profiled("parse")
+def parse_set_input(text):
+    """Parses space-separated integers (or tokens with --strings) into a set.
+
+    Raises ValueError on bad input.
+    """
+    user_input = text.strip()
+    if not user_input: # Handle empty input -> empty set
+        return set()
+    # Attempt to convert all elements to integers (or dictionary IDs)
+    return set(parse_elements(user_input.split()))
+
 def get_set_input(prompt):
     """Helper function to get set input from user."""
     while True:
         try:
             print(f"{CYAN}{prompt}{RESET}", end="") # Added color to prompt
-            user_input = input().strip()
-            if not user_input: # Handle empty input -> empty set
-                return set()
-            # Attempt to convert all elements to integers
-            elements = set(map(int, user_input.split()))
-            return elements
+            return parse_set_input(input())
         except ValueError:
-            print(f"{RED}Invalid input. Please enter space-separated integers only.{RESET}")
+            print(f"{RED}Invalid input. Please enter {element_hint()} only.{RESET}")
         except Exception as e:
             print(f"{RED}An unexpected error occurred: {e}{RESET}")
 
 
+# --- Bulk File Loaders ---
+# Sets can be streamed from disk instead of typed at the prompts. Files are read in
+# fixed-size blocks and parsed straight into the target set, so memory stays bounded by
+# the resulting sets rather than by the size of the input text.
+
+LOAD_CHUNK_SIZE = 1 << 20 # Bytes read per block
+
+def iter_int_chunks(path, chunk_size=LOAD_CHUNK_SIZE):
+    """Yields lists of elements from a newline- (or whitespace-) delimited text file."""
+    with open(path, "r") as f:
+        tail = ""
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            tokens = (tail + block).split()
+            # The last token may continue in the next block
+            tail = tokens.pop() if tokens and not block[-1].isspace() else ""
+            try:
+                yield parse_elements(tokens)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+        if tail:
+            try:
+                yield parse_elements([tail])
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+
+def iter_binary_chunks(path, chunk_size=LOAD_CHUNK_SIZE):
+    """Yields arrays of integers from a raw file of little-endian signed 64-bit values."""
+    chunk_size -= chunk_size % 8
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            if len(block) % 8:
+                raise ValueError(f"{path}: file size is not a multiple of 8 bytes.")
+            values = array("q")
+            values.frombytes(block)
+            if sys.byteorder == "big":
+                values.byteswap()
+            yield values
+
+def load_set_from_lines(path):
+    """Loads one set from a newline-delimited file of integer IDs."""
+    elements = set()
+    for chunk in iter_int_chunks(path):
+        elements.update(chunk)
+    return elements
+
+def load_set_from_binary(path):
+    """Loads one set from a raw binary file of int64 IDs."""
+    elements = set()
+    for chunk in iter_binary_chunks(path):
+        elements.update(chunk if ELEMENT_DICTIONARY is None else ELEMENT_DICTIONARY.encode_all(map(str, chunk)))
+    return elements
+
+def load_sets_from_csv(path, layout="columns"):
+    """Loads labelled sets from a CSV file.
+
+    layout="columns": the header row holds the labels and each column is one set
+                      (blank cells are skipped).
+    layout="labels":  every row is "label,element"; rows are grouped by label.
+    Returns a list of (label, set) pairs in first-seen order.
+    """
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        if layout == "columns":
+            labels = [label.strip() for label in next(reader, [])]
+            columns = [set() for _ in labels]
+            for line_no, row in enumerate(reader, start=2):
+                for column, cell in zip(columns, row):
+                    cell = cell.strip()
+                    if cell:
+                        try:
+                            column.add(parse_elements([cell])[0])
+                        except ValueError:
+                            raise ValueError(f"{path}, line {line_no}: invalid integer {cell!r}") from None
+            return list(zip(labels, columns))
+        if layout == "labels":
+            grouped = {}
+            for line_no, row in enumerate(reader, start=1):
+                if len(row) < 2:
+                    continue
+                label, cell = row[0].strip(), row[1].strip()
+                if line_no == 1 and ELEMENT_DICTIONARY is not None and (label.lower(), cell.lower()) == ("label", "element"):
+                    continue # Header row (tokens cannot be told apart from a header otherwise)
+                try:
+                    element = parse_elements([cell])[0]
+                except ValueError:
+                    if line_no == 1:
+                        continue # Header row
+                    raise ValueError(f"{path}, line {line_no}: invalid integer {cell!r}") from None
+                grouped.setdefault(label, set()).add(element)
+            return list(grouped.items())
+    raise ValueError(f"Unknown CSV layout: {layout}")
+
+def detect_format(path):
+    """Guesses the loader format from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".bin", ".i64"):
+        return "binary"
+    return "lines"
+
+@profiled("load")
+def load_sets(path, fmt="auto", csv_layout="columns"):
+    """Loads one file and returns a list of (label, set) pairs."""
+    if fmt == "auto":
+        fmt = detect_format(path)
+    label = os.path.splitext(os.path.basename(path))[0]
+    if fmt == "lines":
+        return [(label, load_set_from_lines(path))]
+    if fmt == "binary":
+        return [(label, load_set_from_binary(path))]
+    if fmt == "csv":
+        return load_sets_from_csv(path, csv_layout)
+    raise ValueError(f"Unknown input format: {fmt}")
+
+
+# --- Result Cache ---
+# Operation results are memoized on (operation, identity and version of every input).
+# Inputs are held through weak references, so a cached entry never keeps a set alive and
+# is dropped as soon as one of its inputs is garbage collected. Code that mutates a set
+# in place must call bump_version() on it so stale results are discarded. Stored results
+# are frozen (frozensets, read-only mappings and arrays), since every hit hands out the
+# same object.
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+_set_versions = {} # id(set) -> version
+
+def set_version(s):
+    return _set_versions.get(id(s), 0)
+
+def bump_version(s):
+    """Marks `s` as modified, invalidating every cached result computed from it."""
+    _set_versions[id(s)] = set_version(s) + 1
+    RESULT_CACHE.invalidate(s)
+
+def _frozen(value):
+    """Returns a read-only equivalent of a result about to be shared through the cache."""
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: _frozen(v) for key, v in value.items()})
+    if np is not None and isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    return value
+
+def _result_nbytes(value):
+    """Approximate memory held by a cached result."""
+    if isinstance(value, BitmapSet):
+        return value.words.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_result_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """LRU cache of operation results bounded by an approximate byte budget."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (result, weakrefs to inputs, nbytes)
+
+    def get_or_compute(self, operation, inputs, compute):
+        """Returns the cached result for `operation` on `inputs`, computing it on a miss."""
+        if self.max_bytes <= 0:
+            return _run_stage(operation, inputs, compute)
+        key = (operation,) + tuple((id(s), set_version(s)) for s in inputs)
+        entry = self._entries.get(key)
+        if entry is not None and all(ref() is s for ref, s in zip(entry[1], inputs)):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        result = _run_stage(operation, inputs, compute)
+        try:
+            refs = [weakref.ref(s, lambda _, key=key: self._drop(key)) for s in inputs]
+        except TypeError: # Input type without weakref support; don't cache
+            return result
+        nbytes = _result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return result
+        result = _frozen(result)
+        self._drop(key)
+        self._entries[key] = (result, refs, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+        return result
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+
+    def invalidate(self, s):
+        """Drops every entry that has `s` among its inputs."""
+        stale = [key for key, entry in self._entries.items() if any(ref() is s for ref in entry[1])]
+        for key in stale:
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+RESULT_CACHE = ResultCache()
+
+def _run_stage(operation, inputs, compute):
+    """Runs a cache miss as a profiler stage named after the operation."""
+    if not PROFILER.enabled:
+        return compute()
+    PROFILER.count("elements_processed", sum(len(s) for s in inputs))
+    with PROFILER.stage(operation[0] if isinstance(operation, tuple) else operation):
+        return compute()
+
+# Works for both plain sets and BitmapSets: sets[0].union(*rest) == set.union(*sets)
 def union(sets):
     if not sets:
         return set()
-    return set.union(*sets)
+    live = live_aggregates(sets)
+    if live is not None:
+        return live.union()
+    return RESULT_CACHE.get_or_compute("union", sets, lambda: sets[0].union(*sets[1:]))
 
 def intersection(sets):
     if not sets:
@@ -64,57 +578,1328 @@ def intersection(sets):
     # Handle intersection of a single set
     if len(sets) == 1:
         return sets[0].copy()
-    return set.intersection(*sets)
+    live = live_aggregates(sets)
+    if live is not None:
+        return live.intersection_set()
+    return RESULT_CACHE.get_or_compute("intersection", sets, lambda: sets[0].intersection(*sets[1:]))
 
 def difference(set_a, set_b):
-    return set_a - set_b
+    return RESULT_CACHE.get_or_compute("difference", (set_a, set_b), lambda: set_a - set_b)
 
 def symmetric_difference(set_a, set_b):
-    return set_a ^ set_b
+    return RESULT_CACHE.get_or_compute("symmetric_difference", (set_a, set_b), lambda: set_a ^ set_b)
 
 def check_subset(set_a, set_b):
-    return set_a.issubset(set_b)
+    return RESULT_CACHE.get_or_compute("subset", (set_a, set_b), lambda: set_a.issubset(set_b))
 
 def complement(universal, set_a):
-    return universal - set_a
+    return RESULT_CACHE.get_or_compute("complement", (universal, set_a), lambda: universal - set_a)
+
+# --- Bitmap Set Engine ---
+# Each set is stored as a dense bitmap of uint64 words over a shared, sorted index of
+# elements (the Universal Set plus every working set). Set operations become word-wise
+# AND/OR/XOR/ANDNOT and sizes are popcounts; elements are only decoded back into Python
+# sets when a result is printed or handed to a library that needs real sets.
+
+def _popcount(words):
+    """Counts set bits in an array of uint64 words."""
+    if hasattr(np, "bitwise_count"): # NumPy >= 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class BitmapIndex:
+    """Sorted element index that maps integers to bit positions."""
+
+    def __init__(self, elements):
+        self.elements = np.sort(np.fromiter(elements, dtype=np.int64, count=len(elements)))
+        self.num_words = (len(self.elements) + 63) // 64
+
+    def encode(self, elements):
+        """Builds a BitmapSet from an iterable of integers that are all in the index."""
+        values = np.sort(np.fromiter(elements, dtype=np.int64)) # Sorted lookups are cache-friendly
+        positions = np.searchsorted(self.elements, values)
+        if len(values) and (positions.max() >= len(self.elements) or
+                            not np.array_equal(self.elements[positions], values)):
+            raise ValueError("Element is not part of the bitmap index.")
+        bits = np.zeros(self.num_words * 64, dtype=np.uint8)
+        bits[positions] = 1
+        words = np.packbits(bits, bitorder="little").view(np.uint64)
+        return BitmapSet(self, words)
+
+    def decode_word(self, position, word):
+        """Returns the elements for the bits set in the word at `position`."""
+        bits = np.unpackbits(np.array([word], dtype=np.uint64).view(np.uint8), bitorder="little")
+        offsets = position * 64 + np.flatnonzero(bits)
+        return self.elements[offsets[offsets < len(self.elements)]].tolist()
+
+    def decode(self, words):
+        """Returns the sorted element array for the bits set in `words`."""
+        bits = np.unpackbits(words.view(np.uint8), bitorder="little")[:len(self.elements)]
+        return self.elements[bits.astype(bool)]
+
+
+class BitmapSet:
+    """Set-like wrapper around a bitmap, usable wherever the helpers expect a set."""
+
+    __slots__ = ("index", "words", "_size", "__weakref__")
+
+    def __init__(self, index, words):
+        self.index = index
+        self.words = words
+        self._size = None
+
+    def _check(self, other):
+        if not isinstance(other, BitmapSet) or other.index is not self.index:
+            raise TypeError("BitmapSet operations require BitmapSets built from the same index.")
+
+    # --- Set algebra ---
+    def __and__(self, other):
+        self._check(other)
+        return BitmapSet(self.index, self.words & other.words)
+
+    def __or__(self, other):
+        self._check(other)
+        return BitmapSet(self.index, self.words | other.words)
+
+    def __xor__(self, other):
+        self._check(other)
+        return BitmapSet(self.index, self.words ^ other.words)
+
+    def __sub__(self, other):
+        self._check(other)
+        return BitmapSet(self.index, self.words & ~other.words)
+
+    def __le__(self, other):
+        return self.issubset(other)
+
+    def __eq__(self, other):
+        if isinstance(other, BitmapSet):
+            return other.index is self.index and np.array_equal(self.words, other.words)
+        return self.to_set() == other
+
+    __hash__ = None # Mutable-set semantics, like set
+
+    def union(self, *others):
+        words = self.words.copy()
+        for other in others:
+            self._check(other)
+            words |= other.words
+        return BitmapSet(self.index, words)
+
+    def intersection(self, *others):
+        words = self.words.copy()
+        for other in others:
+            self._check(other)
+            words &= other.words
+        return BitmapSet(self.index, words)
+
+    def issubset(self, other):
+        self._check(other)
+        return not np.any(self.words & ~other.words)
+
+    def copy(self):
+        return BitmapSet(self.index, self.words.copy())
+
+    # --- Container protocol ---
+    def __len__(self):
+        if self._size is None:
+            self._size = _popcount(self.words)
+        return self._size
+
+    def __bool__(self):
+        return bool(np.any(self.words))
+
+    def __iter__(self):
+        return iter(self.index.decode(self.words).tolist())
+
+    def __contains__(self, element):
+        pos = int(np.searchsorted(self.index.elements, element))
+        if pos >= len(self.index.elements) or self.index.elements[pos] != element:
+            return False
+        return bool((int(self.words[pos // 64]) >> (pos % 64)) & 1)
+
+    def head(self, count):
+        """Returns up to `count` of the smallest elements, decoding only the words needed."""
+        elements = []
+        for w in np.flatnonzero(self.words):
+            elements.extend(self.index.decode_word(w, self.words[w]))
+            if len(elements) >= count:
+                break
+        return elements[:count]
+
+    def to_set(self):
+        return set(self.index.decode(self.words).tolist())
+
+    def __repr__(self):
+        return repr(self.to_set())
+
+    __str__ = __repr__
+
+
+def encode_sets(universal_set, sets):
+    """Encodes U and the working sets as BitmapSets over one shared index."""
+    if not numpy_available():
+        raise RuntimeError("The bitmap engine requires NumPy (pip install numpy).")
+    index = BitmapIndex(set(universal_set).union(*sets))
+    return index.encode(universal_set), [index.encode(s) for s in sets]
+
+
+def as_python_set(s):
+    """Returns a plain Python set for libraries that need one (e.g. supervenn)."""
+    return s.to_set() if isinstance(s, (BitmapSet, MappedSet, SetView)) else s
+
+# --- Session Snapshots ---
+# A session (U, the working sets and their labels) can be saved to one binary file and
+# reloaded without re-parsing. Layout: the 8-byte magic, a little-endian uint64 header
+# length, a JSON header {"format", "universe", "sets": [{"label", "offset", "count"}]}
+# padded to 8 bytes, then every set as a sorted little-endian int64 array. With NumPy,
+# reloading memory-maps the arrays as MappedSets, so startup cost does not depend on set
+# sizes: len() and previews read only the header and the first elements, and a set is
+# materialized into a Python set the first time an operation needs it.
+
+SESSION_MAGIC = b"SETVIZ\x00\x01"
+SESSION_FORMAT = 1
+
+
+class MappedSet:
+    """Read-only set backed by a sorted int64 array in a memory-mapped session file."""
+
+    __slots__ = ("array", "_set", "__weakref__")
+
+    def __init__(self, array):
+        self.array = array
+        self._set = None
+
+    def to_set(self):
+        """Materializes (once) and returns the elements as a Python set."""
+        if self._set is None:
+            self._set = set(self.array.tolist())
+        return self._set
+
+    def head(self, count):
+        """First `count` elements in ascending order, read straight from the mapping."""
+        return self.array[:count].tolist()
+
+    def __len__(self):
+        return len(self.array)
+
+    def __bool__(self):
+        return len(self.array) > 0
+
+    def __iter__(self):
+        if self._set is not None:
+            return iter(self._set)
+        return (element for start in range(0, len(self.array), LOAD_CHUNK_SIZE)
+                for element in self.array[start:start + LOAD_CHUNK_SIZE].tolist())
+
+    def __contains__(self, element):
+        if not isinstance(element, int) or not -2**63 <= element < 2**63:
+            return False
+        position = int(np.searchsorted(self.array, element))
+        return position < len(self.array) and int(self.array[position]) == element
+
+    def union(self, *others):
+        return self.to_set().union(*map(as_python_set, others))
+
+    def intersection(self, *others):
+        return self.to_set().intersection(*map(as_python_set, others))
+
+    def issubset(self, other):
+        return self.to_set().issubset(as_python_set(other))
+
+    def copy(self):
+        return self.to_set().copy()
+
+    def __and__(self, other): return self.to_set() & as_python_set(other)
+    def __or__(self, other): return self.to_set() | as_python_set(other)
+    def __xor__(self, other): return self.to_set() ^ as_python_set(other)
+    def __sub__(self, other): return self.to_set() - as_python_set(other)
+    def __rand__(self, other): return as_python_set(other) & self.to_set()
+    def __ror__(self, other): return as_python_set(other) | self.to_set()
+    def __rxor__(self, other): return as_python_set(other) ^ self.to_set()
+    def __rsub__(self, other): return as_python_set(other) - self.to_set()
+    def __le__(self, other): return self.issubset(other)
+
+    def __eq__(self, other):
+        return self.to_set() == as_python_set(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"MappedSet({summarize_set(self, 'menu')})"
+
+
+def _session_array(s):
+    """Sorted little-endian int64 values of a set, as a NumPy array or array('q')."""
+    try:
+        if isinstance(s, MappedSet):
+            return s.array
+        if isinstance(s, BitmapSet):
+            return s.index.decode(s.words)
+        if np is not None:
+            return sorted_array(s)
+        values = array("q", sorted(s))
+    except (TypeError, OverflowError, ValueError):
+        raise ValueError("Session files can only store integers that fit in 64 bits.") from None
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def save_session(path, universal_set, sets, labels):
+    """Writes U, the working sets and their labels to a binary session file."""
+    numpy_available()
+    arrays = [_session_array(s) for s in [universal_set] + list(sets)]
+    entries = []
+    offset = 0
+    for a in arrays:
+        entries.append({"offset": offset, "count": len(a)})
+        offset += len(a)
+    for entry, label in zip(entries[1:], labels):
+        entry["label"] = label
+    header = {"format": SESSION_FORMAT, "universe": entries[0], "sets": entries[1:]}
+    if ELEMENT_DICTIONARY is not None: # IDs are only meaningful with their strings
+        header["elements"] = ELEMENT_DICTIONARY.strings
+    header = json.dumps(header).encode()
+    header += b" " * (-(len(SESSION_MAGIC) + 8 + len(header)) % 8) # Align the arrays to 8 bytes
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(SESSION_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for a in arrays:
+            f.write(a.astype("<i8", copy=False).tobytes() if np is not None and isinstance(a, np.ndarray) else a.tobytes())
+    os.replace(temp_path, path) # Never leave a half-written session behind
+    return os.path.getsize(path)
+
+def load_session(path):
+    """Reads a session file; returns (universal_set, sets, labels).
+
+    With NumPy the sets are MappedSets over a read-only memory map of the file;
+    otherwise they are read into Python sets.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+            raise ValueError(f"{path}: not a SetViz session file.")
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length))
+        if header.get("format") != SESSION_FORMAT:
+            raise ValueError(f"{path}: unsupported session format {header.get('format')!r}.")
+        if "elements" in header:
+            enable_element_dictionary(header["elements"])
+        elif ELEMENT_DICTIONARY is not None:
+            raise ValueError(f"{path}: session holds integer elements; load it without --strings.")
+        data_offset = f.tell()
+        entries = [header["universe"]] + header["sets"]
+        total = sum(entry["count"] for entry in entries)
+        if os.path.getsize(path) < data_offset + total * 8:
+            raise ValueError(f"{path}: session file is truncated.")
+        if numpy_available():
+            data = (np.memmap(path, dtype="<i8", mode="r", offset=data_offset, shape=(total,))
+                    if total else np.empty(0, dtype="<i8"))
+            loaded = [MappedSet(data[e["offset"]:e["offset"] + e["count"]]) for e in entries]
+        else:
+            loaded = []
+            for entry in entries:
+                f.seek(data_offset + entry["offset"] * 8)
+                values = array("q")
+                values.frombytes(f.read(entry["count"] * 8))
+                if sys.byteorder == "big":
+                    values.byteswap()
+                loaded.append(set(values))
+    labels = [entry.get("label", f"Set {i}") for i, entry in enumerate(header["sets"], start=1)]
+    return loaded[0], loaded[1:], labels
+
+# --- Region Partition ---
+# A region of an n-set diagram is identified by a membership bitmask: bit i is set when
+# the region lies inside sets[i]. Mask 0b011 of three sets is "in Set 1 and Set 2, not
+# Set 3", which matplotlib-venn calls region '110'.
+
+def region_id(mask, num_sets):
+    """Converts a membership bitmask into a matplotlib-venn region id such as '110'."""
+    return "".join("1" if mask >> i & 1 else "0" for i in range(num_sets))
+
+def region_mask(id_):
+    """Converts a matplotlib-venn region id such as '110' back into a bitmask."""
+    return sum(1 << i for i, flag in enumerate(id_) if flag == "1")
+
+def partition_regions(sets):
+    """Splits the union of `sets` into its Venn regions in a single pass.
+
+    Returns a dict {mask: elements} holding only the non-empty regions, so it works for
+    any number of sets without enumerating all 2^n - 1 masks. Results are cached.
+    """
+    live = live_aggregates(sets)
+    if live is not None:
+        return live.region_map()
+    regions = RESULT_CACHE.get_or_compute("partition", sets, lambda: _partition_regions(sets))
+    PROFILER.count("regions_computed", len(regions))
+    return regions
+
+def _partition_regions(sets):
+    if _use_bitmap_signatures(sets):
+        return _partition_bitmaps(sets)
+    regions = {}
+    for element, mask in _membership_signatures(sets).items():
+        bucket = regions.get(mask)
+        if bucket is None:
+            regions[mask] = bucket = set()
+        bucket.add(element)
+    return regions
+
+def count_regions(sets):
+    """Returns {mask: size} for the non-empty regions without building their contents.
+
+    Cheaper than partition_regions() when only sizes are needed (e.g. for many sets).
+    Results are cached.
+    """
+    live = live_aggregates(sets)
+    if live is not None:
+        return live.region_sizes()
+    counts = RESULT_CACHE.get_or_compute("region_sizes", sets, lambda: _count_regions(sets))
+    PROFILER.count("regions_computed", len(counts))
+    return counts
+
+def _count_regions(sets):
+    regions = sharded_regions(sets) if _use_shards(sets) else None
+    if regions is not None:
+        return {mask: size for mask, (size, _) in regions.items()}
+    if _use_bitmap_signatures(sets):
+        masks, sizes = np.unique(_bitmap_signatures(sets), return_counts=True)
+        return {int(mask): int(size) for mask, size in zip(masks, sizes) if mask}
+    return dict(Counter(_membership_signatures(sets).values()))
+
+def _use_bitmap_signatures(sets):
+    return bool(sets) and len(sets) <= 64 and all(isinstance(s, BitmapSet) for s in sets)
+
+def _membership_signatures(sets):
+    """Maps every element of the union to its membership bitmask."""
+    signatures = {}
+    for i, s in enumerate(sets):
+        bit = 1 << i
+        get = signatures.get
+        for element in s:
+            signatures[element] = get(element, 0) | bit
+    return signatures
+
+def _bitmap_signatures(sets):
+    """Membership bitmask per bit position for BitmapSets sharing one index (<= 64 sets)."""
+    signatures = np.zeros(sets[0].index.num_words * 64, dtype=np.uint64)
+    for i, s in enumerate(sets):
+        bits = np.unpackbits(s.words.view(np.uint8), bitorder="little")
+        signatures |= bits.astype(np.uint64) << np.uint64(i)
+    return signatures
+
+def _partition_bitmaps(sets):
+    """Vectorized partition for BitmapSets sharing one index (up to 64 sets)."""
+    index = sets[0].index
+    signatures = _bitmap_signatures(sets)
+    regions = {}
+    for mask in np.unique(signatures):
+        if mask == 0:
+            continue
+        words = np.packbits(signatures == mask, bitorder="little").view(np.uint64)
+        regions[int(mask)] = BitmapSet(index, words)
+    return regions
+
+def region_counts(regions):
+    """Returns {mask: size} for a partition produced by partition_regions()."""
+    return {mask: len(elements) for mask, elements in regions.items()}
+
+# --- Incremental Editing ---
+# Editing a set in place would normally force union, intersection and the region
+# partition to be recomputed over all data. SetAggregates keeps them current instead: it
+# holds every element's membership bitmask and the regions bucketed by mask, and an edit
+# moves only the touched elements between buckets. While a list of sets is tracked,
+# union(), intersection(), partition_regions() and count_regions() on exactly that list
+# return read-only views of the maintained results (SetViews and mappings), which follow
+# later edits without copying. Cached results computed from the edited set or from those
+# views are invalidated through bump_version(). untrack_sets() stops the maintenance and
+# releases the list.
+
+_live_aggregates = {} # tuple of id(set) -> SetAggregates tracking that list
+
+
+class SetView:
+    """Read-only view of a set maintained by SetAggregates; reflects later edits."""
+
+    __slots__ = ("_set", "__weakref__")
+
+    def __init__(self, s):
+        self._set = s
+
+    def to_set(self):
+        """The underlying set, for code that only reads it."""
+        return self._set
+
+    def __len__(self):
+        return len(self._set)
+
+    def __iter__(self):
+        return iter(self._set)
+
+    def __contains__(self, element):
+        return element in self._set
+
+    def union(self, *others):
+        return self._set.union(*map(as_python_set, others))
+
+    def intersection(self, *others):
+        return self._set.intersection(*map(as_python_set, others))
+
+    def issubset(self, other):
+        return self._set.issubset(as_python_set(other))
+
+    def copy(self):
+        return self._set.copy()
+
+    def __and__(self, other): return self._set & as_python_set(other)
+    def __or__(self, other): return self._set | as_python_set(other)
+    def __xor__(self, other): return self._set ^ as_python_set(other)
+    def __sub__(self, other): return self._set - as_python_set(other)
+    def __rand__(self, other): return as_python_set(other) & self._set
+    def __ror__(self, other): return as_python_set(other) | self._set
+    def __rxor__(self, other): return as_python_set(other) ^ self._set
+    def __rsub__(self, other): return as_python_set(other) - self._set
+    def __le__(self, other): return self.issubset(other)
+
+    def __eq__(self, other):
+        return self._set == as_python_set(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"SetView({summarize_set(self, 'menu')})"
+
+
+class SetAggregates:
+    """Union, intersection, membership masks and Venn regions of a list of sets,
+    updated by applying only the delta of each edit.
+
+    `union_set`, `regions`, `sizes` and `membership` are the working state and must not
+    be modified by callers; union(), region_map() and region_sizes() hand out read-only
+    views of it. `regions` may keep an emptied bucket while a view refers to it.
+    """
+
+    def __init__(self, sets):
+        if any(isinstance(s, BitmapSet) for s in sets):
+            raise TypeError("Editing sets requires the set engine (not --engine bitmap).")
+        self.sets = sets
+        self.full_mask = (1 << len(sets)) - 1
+        # One pass over the data; reuses a cached partition when there is one
+        self.regions = {mask: set(elements) for mask, elements in partition_regions(sets).items()}
+        self.sizes = {mask: len(elements) for mask, elements in self.regions.items()}
+        self.membership = {element: mask for mask, elements in self.regions.items() for element in elements}
+        self.union_set = set(self.membership)
+        self._union_view = SetView(self.union_set)
+        self._views = {} # mask -> SetView of that region's bucket
+        self._regions_view = None
+        self._touched = set() # Masks changed by the current edit
+
+    def union(self):
+        return self._union_view
+
+    def intersection_set(self):
+        return self._view(self.full_mask)
+
+    def region_map(self):
+        """Read-only {mask: SetView} of the non-empty regions."""
+        if self._regions_view is None:
+            self._regions_view = MappingProxyType({mask: self._view(mask) for mask in self.sizes})
+        return self._regions_view
+
+    def region_sizes(self):
+        """Read-only {mask: size} of the non-empty regions."""
+        return MappingProxyType(self.sizes)
+
+    def _view(self, mask):
+        view = self._views.get(mask)
+        if view is None:
+            view = self._views[mask] = SetView(self.regions.setdefault(mask, set()))
+        return view
+
+    def membership_count(self, element):
+        """Number of sets containing `element`."""
+        return bin(self.membership.get(element, 0)).count("1")
+
+    def membership_counts(self):
+        """{k: number of elements contained in exactly k sets}."""
+        counts = Counter()
+        for mask, size in self.sizes.items():
+            counts[bin(mask).count("1")] += size
+        return dict(sorted(counts.items()))
+
+    def add(self, index, elements):
+        """Adds `elements` to sets[index]; returns how many were new."""
+        target = self._own(index)
+        bit = 1 << index
+        added = [element for element in set(elements) if element not in target]
+        for element in added:
+            mask = self.membership.get(element, 0)
+            self._move(element, mask, mask | bit)
+        target.update(added)
+        self._changed(index, len(added))
+        return len(added)
+
+    def remove(self, index, elements):
+        """Removes `elements` from sets[index]; returns how many were present."""
+        target = self._own(index)
+        bit = 1 << index
+        removed = [element for element in set(elements) if element in target]
+        for element in removed:
+            mask = self.membership[element]
+            self._move(element, mask, mask & ~bit)
+        target.difference_update(removed)
+        self._changed(index, len(removed))
+        return len(removed)
+
+    def replace(self, index, elements):
+        """Replaces the contents of sets[index]; returns (added, removed) counts."""
+        new = set(elements)
+        old = self._own(index)
+        return self.add(index, new - old), self.remove(index, old - new)
+
+    def _own(self, index):
+        """Returns sets[index] as a mutable Python set, swapping in a copy if needed."""
+        s = self.sets[index]
+        if type(s) is not set:
+            _live_aggregates.pop(self.key(), None)
+            self.sets[index] = s = set(as_python_set(s))
+            _live_aggregates[self.key()] = self
+        return s
+
+    def _move(self, element, old, new):
+        if old:
+            bucket = self.regions[old]
+            bucket.discard(element)
+            self._touched.add(old)
+            self.sizes[old] -= 1
+            if not bucket:
+                del self.sizes[old]
+                if old not in self._views: # Otherwise the view keeps the bucket
+                    del self.regions[old]
+        if new:
+            bucket = self.regions.setdefault(new, set())
+            bucket.add(element)
+            self._touched.add(new)
+            self.sizes[new] = self.sizes.get(new, 0) + 1
+            self.membership[element] = new
+            self.union_set.add(element)
+        else:
+            del self.membership[element]
+            self.union_set.discard(element)
+
+    def _changed(self, index, count):
+        # The union and region views are handed out by union(), intersection() and
+        # partition_regions(), so results cached from them must be invalidated too
+        if count:
+            views = [self._views[mask] for mask in self._touched if mask in self._views]
+            for s in [self.sets[index], self._union_view, *views]:
+                bump_version(s)
+            self._regions_view = None
+        self._touched.clear()
+        PROFILER.count("elements_edited", count)
+
+    def key(self):
+        return tuple(map(id, self.sets))
+
+
+def track_sets(sets):
+    """Returns the SetAggregates for `sets`, building it (one full pass) on first use."""
+    live = live_aggregates(sets)
+    if live is None:
+        live = SetAggregates(sets)
+        _live_aggregates[live.key()] = live
+    return live
+
+def untrack_sets(sets):
+    """Stops maintaining aggregates for `sets`; returns True if the list was tracked."""
+    return _live_aggregates.pop(tuple(map(id, sets)), None) is not None
+
+def live_aggregates(sets):
+    """The SetAggregates tracking exactly this list of sets, or None."""
+    return _live_aggregates.get(tuple(map(id, sets))) if _live_aggregates else None
+
+# --- Sharded Execution ---
+# With --sharded, Venn region counts over large integer sets run across a process pool.
+# Each set is converted once (and cached) to a sorted int64 array; the arrays are copied
+# into one shared-memory block, and the value range is cut into shards at quantiles of
+# the data. A worker binary-searches each set for its shard's value range, so no set is
+# ever pickled, and returns small per-region counts, merged in value order. Union and
+# intersection are not sharded: their result is a Python set, and building it is serial
+# work the size of the output. Small inputs, BitmapSets (already vectorized) and
+# non-integer sets use the single-process path.
+
+SHARD_SETTINGS = {"enabled": False, "workers": None, "min_elements": 1 << 20, "shards_per_worker": 4}
+_shard_pool = None
+
+def _use_shards(sets):
+    return (SHARD_SETTINGS["enabled"] and 1 < len(sets) <= 62
+            and all(isinstance(s, (set, frozenset, MappedSet)) for s in sets)
+            and sum(len(s) for s in sets) >= SHARD_SETTINGS["min_elements"]
+            and numpy_available())
+
+def sorted_array(s):
+    """Returns the elements of an integer set as a sorted int64 array (cached)."""
+    if isinstance(s, MappedSet): # Already sorted on disk
+        return s.array
+    def compute():
+        values = np.fromiter(s, dtype=np.int64, count=len(s))
+        values.sort()
+        return values
+    return RESULT_CACHE.get_or_compute("sorted_array", (s,), compute)
+
+def _shard_bounds(arrays, count):
+    """Picks count - 1 split values at quantiles of a sample of all arrays."""
+    sample = np.sort(np.concatenate([a[::max(1, len(a) // 4096)] for a in arrays if len(a)]))
+    cuts = np.unique(sample[(np.arange(1, count) * len(sample)) // count])
+    bounds = [None] + [int(cut) for cut in cuts] + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _shard_slices(data, layout, low, high):
+    """Slices each set's sorted array to the value range [low, high)."""
+    slices = []
+    for start, length in layout:
+        values = data[start:start + length]
+        lo = 0 if low is None else int(np.searchsorted(values, low))
+        hi = length if high is None else int(np.searchsorted(values, high))
+        slices.append(values[lo:hi])
+    return slices
+
+def _sorted_unique(values):
+    """Returns (distinct values, start index of each run) of an already sorted array."""
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1]))) if len(values) else np.empty(0, np.intp)
+    return values[starts], starts
+
+def _shard_regions(slices, head):
+    """{mask: (count, first `head` elements)} for the elements of one shard."""
+    elements = np.concatenate(slices)
+    if not len(elements):
+        return {}
+    tags = np.repeat(np.left_shift(1, np.arange(len(slices), dtype=np.int64)), [len(v) for v in slices])
+    order = np.argsort(elements, kind="stable")
+    elements, tags = elements[order], tags[order]
+    _, starts = _sorted_unique(elements)
+    masks = np.bitwise_or.reduceat(tags, starts)
+    values, runs = _sorted_unique(np.sort(masks))
+    counts = np.diff(np.append(runs, len(masks)))
+    regions = {}
+    for mask, size in zip(values.tolist(), counts.tolist()):
+        sample = elements[starts[masks == mask][:head]].tolist() if head else []
+        regions[mask] = (size, sample)
+    return regions
+
+def _shard_task(task):
+    """Worker entry point: counts the regions of one shard of the shared-memory arrays."""
+    from multiprocessing.shared_memory import SharedMemory
+    numpy_available()
+    input_name, layout, low, high, head = task
+    source = SharedMemory(name=input_name)
+    try:
+        return _evaluate_shard(source, layout, low, high, head)
+    finally:
+        source.close()
+
+def _evaluate_shard(source, layout, low, high, head):
+    # Every view of the shared buffer is local here, so it is released before close()
+    data = np.ndarray((sum(length for _, length in layout),), dtype=np.int64, buffer=source.buf)
+    return _shard_regions(_shard_slices(data, layout, low, high), head)
+
+def _get_shard_pool():
+    global _shard_pool
+    if _shard_pool is None:
+        import atexit
+        from concurrent.futures import ProcessPoolExecutor
+        _shard_pool = ProcessPoolExecutor(max_workers=SHARD_SETTINGS["workers"])
+        atexit.register(_shard_pool.shutdown)
+    return _shard_pool
+
+def sharded_regions(sets, head=0):
+    """Counts the Venn regions of `sets` shard by shard.
+
+    Returns {mask: (count, first elements)}, with at most `head` elements per region in
+    ascending order, or None if the elements do not fit in int64.
+    """
+    from multiprocessing.shared_memory import SharedMemory
+    try:
+        arrays = [sorted_array(s) for s in sets]
+    except (TypeError, ValueError, OverflowError):
+        return None
+    total = sum(len(a) for a in arrays)
+    workers = SHARD_SETTINGS["workers"] or os.cpu_count() or 1
+    bounds = _shard_bounds(arrays, workers * SHARD_SETTINGS["shards_per_worker"])
+    PROFILER.count("shards", len(bounds))
+    source = SharedMemory(create=True, size=max(total, 1) * 8)
+    try:
+        layout = []
+        data = np.ndarray((total,), dtype=np.int64, buffer=source.buf)
+        start = 0
+        for a in arrays:
+            data[start:start + len(a)] = a
+            layout.append((start, len(a)))
+            start += len(a)
+        del data
+        tasks = [(source.name, layout, low, high, head) for low, high in bounds]
+        if workers == 1:
+            outcomes = [_shard_task(task) for task in tasks]
+        else:
+            outcomes = list(_get_shard_pool().map(_shard_task, tasks))
+        regions = {} # Shards are in value order, so heads stay ascending
+        for shard in outcomes:
+            for mask, (size, sample) in shard.items():
+                merged = regions.setdefault(mask, [0, []])
+                merged[0] += size
+                merged[1].extend(sample[:head - len(merged[1])])
+        return {mask: (size, sample) for mask, (size, sample) in regions.items()}
+    finally:
+        source.close()
+        source.unlink()
+
+# --- Set Expression Language ---
+# Expressions such as "(S1 & S3 & S5) - (S2 | ~S4)" are parsed into a small tree of
+# tuples, rewritten by optimize_expression() and evaluated with the helpers above.
+# Operators follow Python's precedence: ~ (complement w.r.t. U) binds tightest, then
+# -, &, ^ and | loosest. Operands are S1..Sn, U, or a set label without spaces.
+#
+# Node shapes:  ("set", i)  ("universe",)  ("not", x)  ("diff", a, b)  ("xor", a, b)
+#               ("union", (x, y, ...))  ("inter", (x, y, ...))
+
+_TOKEN_RE = re.compile(r"\s*(?:(\w+)|(.))")
+_BINARY_OPS = [("|", "union"), ("^", "xor"), ("&", "inter"), ("-", "diff")] # Lowest precedence first
+
+def parse_expression(text, labels=None):
+    """Parses a set expression into a tree, resolving operands against `labels`."""
+    tokens = [m.group(1) or m.group(2) for m in _TOKEN_RE.finditer(text.strip())]
+    tokens = [t for t in tokens if not t.isspace()]
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_level(level):
+        if level == len(_BINARY_OPS):
+            return parse_unary()
+        symbol, kind = _BINARY_OPS[level]
+        node = parse_level(level + 1)
+        while peek() == symbol:
+            take()
+            rhs = parse_level(level + 1)
+            node = (kind, (node, rhs)) if kind in ("union", "inter") else (kind, node, rhs)
+        return node
+
+    def parse_unary():
+        token = peek()
+        if token is None:
+            raise ValueError("Unexpected end of expression.")
+        take()
+        if token == "~":
+            return ("not", parse_unary())
+        if token == "(":
+            node = parse_level(0)
+            if peek() != ")":
+                raise ValueError("Missing closing parenthesis.")
+            take()
+            return node
+        if token == "U":
+            return ("universe",)
+        if re.fullmatch(r"[Ss]\d+", token):
+            return ("set", int(token[1:]) - 1)
+        if labels and token in labels:
+            return ("set", labels.index(token))
+        raise ValueError(f"Unknown operand or symbol: {token!r}")
+
+    node = parse_level(0)
+    if peek() is not None:
+        raise ValueError(f"Unexpected token: {peek()!r}")
+    return node
+
+def expression_sets(node):
+    """Returns the sorted indices of the working sets referenced by an expression."""
+    kind = node[0]
+    if kind == "set":
+        return [node[1]]
+    if kind == "universe":
+        return []
+    children = node[1] if kind in ("union", "inter") else node[1:]
+    return sorted(set().union(*(expression_sets(child) for child in children)))
+
+def _negate(node):
+    return node[1] if node[0] == "not" else ("not", node)
+
+def _nary(kind, operands):
+    operands = tuple(sorted(set(operands))) # Deduplicate and canonicalize for reuse
+    return operands[0] if len(operands) == 1 else (kind, operands)
+
+def optimize_expression(node, push_complements=True):
+    """Rewrites an expression so complements are applied last, against U.
+
+    n-ary unions/intersections are flattened and deduplicated, double complements
+    cancel, and every complement is pushed outward with De Morgan's laws:
+        A & ~B -> A - B        A | ~B -> ~(B - A)        A - ~B -> A & B
+    so at most one `U - x` is evaluated, at the very end. These identities only hold
+    when the operands lie inside U; pass push_complements=False otherwise to keep the
+    complements where they are and only flatten and deduplicate.
+    """
+    kind = node[0]
+    if kind in ("set", "universe"):
+        return node
+    if not push_complements:
+        if kind in ("not", "diff", "xor"):
+            return (kind,) + tuple(optimize_expression(x, False) for x in node[1:])
+        operands = []
+        for child in node[1]:
+            child = optimize_expression(child, False)
+            operands.extend(child[1] if child[0] == kind else [child])
+        return _nary(kind, operands)
+    if kind == "not":
+        return _negate(optimize_expression(node[1]))
+    if kind in ("diff", "xor"):
+        a, b = optimize_expression(node[1]), optimize_expression(node[2])
+        if kind == "xor":
+            if a[0] == "not" and b[0] == "not":
+                return ("xor", a[1], b[1])
+            if a[0] == "not" or b[0] == "not":
+                return ("not", ("xor", _negate(a), b) if a[0] == "not" else ("xor", a, _negate(b)))
+            return ("xor", a, b)
+        # a - b == a & ~b
+        return optimize_expression(("inter", (a, _negate(b))))
+
+    operands = []
+    pending = [optimize_expression(child) for child in node[1]]
+    while pending:
+        child = pending.pop()
+        if child[0] == kind:
+            pending.extend(child[1])
+        elif kind == "inter" and child[0] == "diff": # x - y inside & is x & ~y
+            pending.extend([child[1], _negate(child[2])])
+        else:
+            operands.append(child)
+    positives = [x for x in operands if x[0] != "not"]
+    negatives = [x[1] for x in operands if x[0] == "not"]
+    if kind == "inter":
+        # P1 & P2 & ~N1 & ~N2 == (P1 & P2) - (N1 | N2);  ~N1 & ~N2 == ~(N1 | N2)
+        if not negatives:
+            return _nary("inter", positives)
+        removed = _nary("union", negatives)
+        if not positives:
+            return ("not", removed)
+        return ("diff", _nary("inter", positives), removed)
+    # P1 | P2 | ~N1 | ~N2 == ~((N1 & N2) - (P1 | P2))
+    if not negatives:
+        return _nary("union", positives)
+    kept = _nary("inter", negatives)
+    if not positives:
+        return ("not", kept)
+    return ("not", ("diff", kept, _nary("union", positives)))
+
+def _estimate_size(node, sets, universal_set):
+    """Cheap upper bound on a node's result size, used to order operands."""
+    kind = node[0]
+    if kind == "set":
+        return len(sets[node[1]])
+    if kind in ("universe", "not"):
+        return len(universal_set)
+    if kind == "inter":
+        return min(_estimate_size(x, sets, universal_set) for x in node[1])
+    if kind == "diff":
+        return _estimate_size(node[1], sets, universal_set)
+    children = node[1] if kind == "union" else node[1:]
+    return sum(_estimate_size(x, sets, universal_set) for x in children)
+
+def evaluate_expression(node, sets, universal_set, memo=None):
+    """Evaluates an (optimized) expression tree with the set operation helpers.
+
+    Intersections start from the smallest operand and stop as soon as the running
+    result is empty, without evaluating the remaining operands. Identical subtrees are
+    evaluated once and shared through `memo`.
+    """
+    if memo is None:
+        memo = {}
+    if node in memo:
+        return memo[node]
+    kind = node[0]
+
+    def ev(child):
+        return evaluate_expression(child, sets, universal_set, memo)
+
+    if kind == "set":
+        result = sets[node[1]]
+    elif kind == "universe":
+        result = universal_set
+    elif kind == "not":
+        result = complement(universal_set, ev(node[1]))
+    elif kind == "diff":
+        result = ev(node[1])
+        if result:
+            result = difference(result, ev(node[2]))
+    elif kind == "xor":
+        result = symmetric_difference(ev(node[1]), ev(node[2]))
+    elif kind == "union":
+        result = union([ev(x) for x in node[1]])
+    else: # "inter"
+        ordered = sorted(node[1], key=lambda x: _estimate_size(x, sets, universal_set))
+        result = ev(ordered[0])
+        for operand in ordered[1:]:
+            if not result:
+                break
+            result = intersection([result, ev(operand)])
+    memo[node] = result
+    return result
+
+@profiled("expression")
+def run_expression(text, sets, universal_set, labels=None):
+    """Parses, optimizes and evaluates a set expression; returns (result, tree)."""
+    tree = parse_expression(text, labels)
+    for i in expression_sets(tree):
+        if not 0 <= i < len(sets):
+            raise ValueError(f"Invalid set number: {i + 1}. Please choose between 1 and {len(sets)}.")
+    # Complement rewrites are only exact when every referenced set lies inside U
+    closed = all(check_subset(sets[i], universal_set) for i in expression_sets(tree))
+    tree = optimize_expression(tree, push_complements=closed)
+    return evaluate_expression(tree, sets, universal_set), tree
+
+# --- Approximate Sketches ---
+# For very large sets, exact region sizes can be replaced by estimates from a compact
+# per-set sketch: a HyperLogLog register array for cardinalities and a bottom-k MinHash
+# sample for overlaps. Both are mergeable, so the union of any sets is estimated from
+# their sketches alone. Region sizes come from the bottom-k sample of the union: each
+# sampled hash belongs to exactly one region, and the region's share of the sample times
+# the union estimate is its size. Enabled with --approximate (requires NumPy).
+
+SKETCH_SETTINGS = {"enabled": False, "precision": 14, "k": 4096} # 2^14 HLL registers, 4096 MinHash samples
+SKETCH_CHUNK = 1 << 22 # Elements hashed per block while building a sketch
+
+
+class SetSketch:
+    """HyperLogLog registers plus the k smallest element hashes of one set."""
+
+    __slots__ = ("registers", "minhash", "k", "__weakref__")
+
+    def __init__(self, registers, minhash, k):
+        self.registers = registers
+        self.minhash = minhash
+        self.k = k
+
+
+def _hash64(values):
+    """SplitMix64 finalizer: a fast, well-mixed 64-bit hash of int64 values."""
+    h = values.astype(np.uint64, copy=True)
+    h += np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for uint64 arrays."""
+    lengths = np.zeros(values.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[big] += shift
+        values = np.where(big, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+def _hll_estimate(registers):
+    m = registers.size
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int32)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros: # Small-range correction (linear counting)
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+def _iter_int64_chunks(s):
+    if isinstance(s, (BitmapSet, MappedSet)):
+        elements = s.array if isinstance(s, MappedSet) else s.index.decode(s.words)
+        for start in range(0, len(elements), SKETCH_CHUNK):
+            yield elements[start:start + SKETCH_CHUNK]
+        return
+    iterator = iter(s)
+    while True:
+        chunk = np.fromiter(islice(iterator, SKETCH_CHUNK), dtype=np.int64)
+        if not len(chunk):
+            return
+        yield chunk
+
+def build_sketch(s, precision=None, k=None):
+    """Builds (and caches) the HyperLogLog + MinHash sketch of an integer set."""
+    precision = precision or SKETCH_SETTINGS["precision"]
+    k = k or SKETCH_SETTINGS["k"]
+    return RESULT_CACHE.get_or_compute(("sketch", precision, k), (s,), lambda: _build_sketch(s, precision, k))
+
+def _build_sketch(s, precision, k):
+    if not numpy_available():
+        raise RuntimeError("Approximate mode requires NumPy (pip install numpy).")
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    minhash = np.empty(0, dtype=np.uint64)
+    for chunk in _iter_int64_chunks(s):
+        hashes = _hash64(chunk)
+        # HyperLogLog: top `precision` bits pick the register, the rest give the rank
+        index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+        ranks = (64 - precision + 1 - _bit_length(rest).astype(np.int16)).astype(np.uint8)
+        np.maximum.at(registers, index, ranks)
+        # Bottom-k MinHash: keep the k smallest distinct hashes seen so far
+        minhash = np.union1d(minhash, hashes if len(hashes) <= k else np.partition(hashes, k - 1)[:k])[:k]
+    return SetSketch(registers, minhash, k)
+
+def estimate_regions(sets):
+    """Estimates Venn region sizes from sketches.
+
+    Returns {"union": (estimate, error), "regions": {mask: (estimate, error)}} where
+    `error` is a 95% bound (two standard errors) combining the HyperLogLog error of
+    the union with the sampling error of the region's share. When every set fits in
+    the MinHash sample, the results are exact and the errors are zero.
+    """
+    sketches = [build_sketch(s) for s in sets]
+    k = sketches[0].k
+    registers = np.maximum.reduce([sk.registers for sk in sketches])
+    sample = np.unique(np.concatenate([sk.minhash for sk in sketches]))[:k]
+    if len(sample) < k: # The sample holds every element of the union: exact counts
+        union_size, union_error = float(len(sample)), 0.0
+    else:
+        union_size = _hll_estimate(registers)
+        union_error = union_size * 1.04 / float(np.sqrt(registers.size))
+    # A sampled hash lies in set i exactly when it is also in set i's bottom-k sample
+    masks = np.zeros(len(sample), dtype=np.int64)
+    for i, sk in enumerate(sketches):
+        masks |= np.isin(sample, sk.minhash).astype(np.int64) << i
+    regions = {}
+    if len(sample):
+        for mask, hits in zip(*np.unique(masks, return_counts=True)):
+            share = hits / len(sample)
+            estimate = share * union_size
+            if union_error == 0:
+                error = 0.0
+            else:
+                variance = share * (1 - share) / len(sample) * union_size ** 2 + (share * union_error) ** 2
+                error = 2 * float(np.sqrt(variance))
+            regions[int(mask)] = (float(estimate), error)
+    return {"union": (union_size, 2 * union_error), "regions": regions}
+
+def estimate_intersection(sets):
+    """Estimated size (and 95% error bound) of the intersection of all `sets`."""
+    full = (1 << len(sets)) - 1
+    return estimate_regions(sets)["regions"].get(full, (0.0, 0.0))
+
+def format_estimate(estimate, error):
+    """Formats an estimate as '≈ 1,234 ± 56' (or the exact value when error is 0)."""
+    if error == 0:
+        return f"{estimate:,.0f}"
+    return f"≈ {estimate:,.0f} ± {error:,.0f}"
+
+# --- All-Pairs Similarity ---
+# One pass computes the N x N matrix of intersection sizes for every pair of sets. With
+# NumPy, the sets are packed into a bit matrix and the counts come from a chunked Gram
+# product (bits @ bits.T), which BLAS evaluates for all pairs at once; Jaccard, overlap
+# coefficient and subset relations are then derived element-wise from the counts.
+
+SIMILARITY_CHUNK_WORDS = 1024 # 65,536 elements per Gram-product block
+
+def similarity_matrix(sets):
+    """Returns {"sizes", "intersection", "jaccard", "overlap", "subset"} for all pairs.
+
+    subset[i][j] is True when sets[i] is a subset of sets[j]. Ratios whose denominator is
+    zero are 1.0 when both sets are empty and 0.0 otherwise. Results are cached.
+    """
+    return RESULT_CACHE.get_or_compute("similarity", sets, lambda: _similarity_matrix(sets))
+
+def _intersection_counts(sets):
+    if numpy_available():
+        try:
+            if all(isinstance(s, BitmapSet) for s in sets):
+                words = np.stack([s.words for s in sets])
+            else:
+                index = BitmapIndex(set().union(*sets))
+                words = np.stack([index.encode(s).words for s in sets])
+        except (TypeError, ValueError, OverflowError):
+            words = None # Elements that don't fit in int64: fall back to pairwise sets
+        if words is not None:
+            counts = np.zeros((len(sets), len(sets)), dtype=np.int64)
+            for start in range(0, words.shape[1], SIMILARITY_CHUNK_WORDS):
+                block = words[:, start:start + SIMILARITY_CHUNK_WORDS]
+                bits = np.unpackbits(np.ascontiguousarray(block).view(np.uint8), axis=1).astype(np.float32)
+                counts += np.rint(bits @ bits.T).astype(np.int64)
+            return counts
+    return [[len(a & b) if j != i else len(a) for j, b in enumerate(sets)] for i, a in enumerate(sets)]
+
+def _similarity_matrix(sets):
+    counts = _intersection_counts(sets)
+    sizes = [len(s) for s in sets]
+    if np is not None and isinstance(counts, np.ndarray):
+        sizes = np.array(sizes, dtype=np.int64)
+        unions = sizes[:, None] + sizes[None, :] - counts
+        mins = np.minimum(sizes[:, None], sizes[None, :])
+        both_empty = (unions == 0).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaccard = np.where(unions > 0, counts / unions, both_empty)
+            overlap = np.where(mins > 0, counts / mins, both_empty)
+        subset = counts == sizes[:, None]
+    else:
+        n = len(sets)
+        def ratio(num, den, i, j):
+            return num / den if den else float(sizes[i] == sizes[j] == 0)
+        jaccard = [[ratio(counts[i][j], sizes[i] + sizes[j] - counts[i][j], i, j) for j in range(n)] for i in range(n)]
+        overlap = [[ratio(counts[i][j], min(sizes[i], sizes[j]), i, j) for j in range(n)] for i in range(n)]
+        subset = [[counts[i][j] == sizes[i] for j in range(n)] for i in range(n)]
+    return {"sizes": sizes, "intersection": counts, "jaccard": jaccard, "overlap": overlap, "subset": subset}
+
+def _relation(similarity, i, j):
+    subset = similarity["subset"]
+    if subset[i][j] and subset[j][i]:
+        return "A = B"
+    if subset[i][j]:
+        return "A ⊂ B"
+    if subset[j][i]:
+        return "A ⊃ B"
+    return ""
+
+def format_similarity_table(similarity, labels, limit=20):
+    """Formats the most similar pairs (by Jaccard, then overlap) as a text table."""
+    n = len(labels)
+    jaccard, overlap, counts = similarity["jaccard"], similarity["overlap"], similarity["intersection"]
+    if np is not None and isinstance(jaccard, np.ndarray):
+        rows, cols = np.triu_indices(n, k=1)
+        order = np.lexsort((-overlap[rows, cols], -jaccard[rows, cols]))[:limit]
+        pairs = list(zip(rows[order].tolist(), cols[order].tolist()))
+        duplicates = int(np.sum(similarity["subset"][rows, cols] & similarity["subset"][cols, rows]))
+        containments = int(np.sum(similarity["subset"][rows, cols] ^ similarity["subset"][cols, rows]))
+    else:
+        all_pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        pairs = sorted(all_pairs, key=lambda p: (-jaccard[p[0]][p[1]], -overlap[p[0]][p[1]]))[:limit]
+        relations = [_relation(similarity, i, j) for i, j in all_pairs]
+        duplicates = relations.count("A = B")
+        containments = sum(1 for r in relations if r in ("A ⊂ B", "A ⊃ B"))
+
+    width = max([len("Set A")] + [len(label) for label in labels])
+    lines = [f"{'Set A':<{width}}  {'Set B':<{width}}  {'|A ∩ B|':>12}  {'Jaccard':>7}  {'Overlap':>7}  Relation"]
+    for i, j in pairs:
+        lines.append(f"{labels[i]:<{width}}  {labels[j]:<{width}}  {int(counts[i][j]):>12,}  "
+                     f"{jaccard[i][j]:>7.3f}  {overlap[i][j]:>7.3f}  {_relation(similarity, i, j)}")
+    total = n * (n - 1) // 2
+    lines.append(f"Showing {len(pairs)} of {total:,} pairs; {duplicates} identical pair(s), {containments} strict containment(s).")
+    return "\n".join(lines)
+
+# --- Set Summaries ---
+# Labels, titles, menu lines and printed results never stringify a whole set. Only the
+# first few elements are formatted, followed by the total count, so the cost of a redraw
+# does not grow with set size. Limits are per display context and can be changed with
+# configure_summary() or the --max-elements / --max-label-elements options.
+
+SUMMARY_LIMITS = {
+    # context: (max elements shown, max characters for the element list)
+    "label": (8, 40),    # Venn region labels
+    "title": (20, 80),   # Plot titles
+    "menu": (20, 60),    # Set lines in the menu
+    "print": (1000, 8000), # Results printed to the console
+}
+
+def configure_summary(context, max_elements=None, max_chars=None):
+    """Changes the size limits of one summary context; limits must be at least 1."""
+    for name, limit in (("max_elements", max_elements), ("max_chars", max_chars)):
+        if limit is not None and limit < 1:
+            raise ValueError(f"{name} must be at least 1, got {limit}")
+    elements, chars = SUMMARY_LIMITS[context]
+    SUMMARY_LIMITS[context] = (max_elements if max_elements is not None else elements,
+                               max_chars if max_chars is not None else chars)
+
+def summarize_set(value, context="print"):
+    """Formats a set as '{1, 2, 3, ...} (N elements)' within the context's limits.
+
+    Non-set values (e.g. "Result: True") are converted with str() and truncated.
+    """
+    max_elements, max_chars = SUMMARY_LIMITS[context]
+    if not isinstance(value, (set, frozenset, BitmapSet, MappedSet, SetView)):
+        text = str(value)
+        return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+    size = len(value)
+    head = value.head(max_elements) if isinstance(value, (BitmapSet, MappedSet)) else islice(value, max_elements)
+    return format_summary(head, size, context)
+
+def format_summary(head, size, context="print"):
+    """Formats the first elements `head` of a collection of `size` elements like summarize_set()."""
+    _, max_chars = SUMMARY_LIMITS[context]
+    if size == 0:
+        return "set()"
+    parts = []
+    length = 2
+    for element in head:
+        text = display_element(element)
+        if parts and length + len(text) + 2 > max_chars:
+            break
+        parts.append(text)
+        length += len(text) + 2
+    if len(parts) == size:
+        return "{" + ", ".join(parts) + "}"
+    return "{" + ", ".join(parts) + f", ...}} ({size:,} elements)"
 
 # --- Plotting Function ---
 
-def plot_sets(sets, operation, result, set_indices=None):
-    """Function to plot Venn diagrams with labels, highlighting, and enhanced styling."""
+def region_sizes_and_labels(sets):
+    """Returns ({mask: size}, {mask: label text}) for the regions of a Venn diagram.
+
+    Exact mode labels each region with a bounded summary of its elements; approximate
+    mode uses sketch estimates and labels regions with the estimate instead.
+    """
+    if SKETCH_SETTINGS["enabled"]:
+        estimates = estimate_regions(sets)["regions"]
+        sizes = {mask: round(estimate) for mask, (estimate, _) in estimates.items()}
+        texts = {mask: format_estimate(estimate, error) for mask, (estimate, error) in estimates.items()}
+        return sizes, texts
+    # Counts plus the first few elements of each region, from the shards, unless the list
+    # is tracked for editing and its regions are already maintained
+    if _use_shards(sets) and live_aggregates(sets) is None:
+        regions = sharded_regions(sets, head=SUMMARY_LIMITS["label"][0])
+        if regions is not None:
+            return ({mask: size for mask, (size, _) in regions.items()},
+                    {mask: format_summary(sample, size, "label") for mask, (size, sample) in regions.items()})
+    regions = partition_regions(sets)
+    return region_counts(regions), {mask: summarize_set(elements, "label") for mask, elements in regions.items()}
+
+
+@profiled("plot")
+def plot_sets(sets, operation, result, set_indices=None, labels=None, save_path=None):
+    """Function to plot Venn diagrams with labels, highlighting, and enhanced styling.
+
+    The figure is shown in a window, or written to `save_path` (format taken from the
+    extension) in headless mode. Returns the saved file path, if any.
+    """
     num_sets_in_plot = len(sets)
     op = operation.lower()
     alpha = 0.6 # Transparency for fills
 
+    # Determine default labels based on original indices if provided
+    # (`labels` holds the names of all defined sets, e.g. from a CSV header)
+    if set_indices:
+        default_labels = [labels[i] if labels else f"Set {i+1}" for i in set_indices]
+    else:
+        default_labels = list(labels) if labels else [f"Set {i+1}" for i in range(num_sets_in_plot)]
+
     # --- Check if plotting is feasible ---
     if num_sets_in_plot < 2:
         print(f"{YELLOW}⚠ Venn diagrams require at least 2 sets to plot.{RESET}")
-        print(f"{operation} Result: {result}") # Still print result textually
-        return
-    if num_sets_in_plot > 3 and not SUPERVENN_AVAILABLE:
-        print(f"{YELLOW}⚠ Supervenn library not available. Cannot visualize {num_sets_in_plot} sets.{RESET}")
-        print(f"{operation} Result: {result}")
-        return
-    if num_sets_in_plot > 6:
-        print(f"{YELLOW}⚠ Visualization might become complex or unsupported for {num_sets_in_plot} sets.{RESET}")
-        print(f"{operation} Result: {result}")
+        print(f"{operation} Result: {summarize_set(result)}") # Still print result textually
         return
+    if num_sets_in_plot > 6 or (num_sets_in_plot > 3 and (SKETCH_SETTINGS["enabled"] or not supervenn_available())):
+        # Too many sets for Venn/Supervenn (or only sketches available): draw the
+        # scalable intersection matrix instead
+        return plot_intersection_matrix(sets, operation, result, default_labels, save_path)
 
     # --- Proceed with Plotting ---
+    load_plotting()
     plt.figure(figsize=(8, 8)) # Default size, might be overridden by supervenn
 
-    # Determine default labels based on original indices if provided
-    if set_indices:
-        default_labels = [f"Set {i+1}" for i in set_indices]
-    else:
-        default_labels = [f"Set {i+1}" for i in range(num_sets_in_plot)]
-
-    plot_title = f"{operation}: {result}" # Base title
+    result_text = summarize_set(result, "title")
+    plot_title = f"{operation}: {result_text}" # Base title
 
     # --- Standard Venn (2 or 3 sets) ---
     if num_sets_in_plot == 2:
-        a, b = sets
-        subsets_data = (len(a - b), len(b - a), len(a & b))
+        sizes, region_texts = region_sizes_and_labels(sets)
+        subsets_data = {region_id(mask, 2): size for mask, size in sizes.items()}
         v = venn2(subsets=subsets_data, set_labels=default_labels, set_colors=(PALETTE[0], PALETTE[1]), alpha=alpha)
 
         region_ids = ['10', '01', '11']
@@ -124,32 +1909,28 @@ def plot_sets(sets, operation, result, set_indices=None):
         if patches.get('01'): patches['01'].set_color(PALETTE[1]); patches['01'].set_alpha(0.4)
         if patches.get('11'): patches['11'].set_color(PALETTE[3]); patches['11'].set_alpha(0.5)
 
-        if v.get_label_by_id('10'): v.get_label_by_id('10').set_text(a - b if a-b else '')
-        if v.get_label_by_id('01'): v.get_label_by_id('01').set_text(b - a if b-a else '')
-        if v.get_label_by_id('11'): v.get_label_by_id('11').set_text(a & b if a&b else '')
+        for id_ in region_ids:
+            if v.get_label_by_id(id_): v.get_label_by_id(id_).set_text(region_texts.get(region_mask(id_), ''))
 
         if op == "union":
             if patches.get('10'): patches['10'].set_color(PALETTE[0]); patches['10'].set_alpha(alpha)
             if patches.get('01'): patches['01'].set_color(PALETTE[1]); patches['01'].set_alpha(alpha)
             if patches.get('11'): patches['11'].set_color(PALETTE[3]); patches['11'].set_alpha(alpha)
-            plot_title = f"Union (Highlighted): {result}"
+            plot_title = f"Union (Highlighted): {result_text}"
         elif op == "intersection":
             if patches.get('11'): patches['11'].set_color(HIGHLIGHT_INTERSECTION); patches['11'].set_alpha(alpha+0.1)
-            plot_title = f"Intersection (Highlighted): {result}"
+            plot_title = f"Intersection (Highlighted): {result_text}"
         elif op == "difference":
             if patches.get('10'): patches['10'].set_color(HIGHLIGHT_DIFFERENCE); patches['10'].set_alpha(alpha)
-            plot_title = f"Difference (Highlighted): {result}"
+            plot_title = f"Difference (Highlighted): {result_text}"
         elif op == "symmetric difference":
             if patches.get('10'): patches['10'].set_color(HIGHLIGHT_SYMM_DIFF_A); patches['10'].set_alpha(alpha)
             if patches.get('01'): patches['01'].set_color(HIGHLIGHT_SYMM_DIFF_B); patches['01'].set_alpha(alpha)
-            plot_title = f"Symmetric Difference (Highlighted): {result}"
+            plot_title = f"Symmetric Difference (Highlighted): {result_text}"
 
     elif num_sets_in_plot == 3:
-        a, b, c = sets
-        subsets_data = (
-            len(a - b - c), len(b - a - c), len((a & b) - c), len(c - a - b),
-            len((a & c) - b), len((b & c) - a), len(a & b & c)
-        )
+        sizes, region_texts = region_sizes_and_labels(sets)
+        subsets_data = {region_id(mask, 3): size for mask, size in sizes.items()}
         v = venn3(subsets=subsets_data, set_labels=default_labels, set_colors=(PALETTE[0], PALETTE[1], PALETTE[2]), alpha=alpha)
 
         region_ids = ['100', '010', '110', '001', '101', '011', '111']
@@ -160,37 +1941,31 @@ def plot_sets(sets, operation, result, set_indices=None):
             patch.set_color(color_map_default.get(id_, 'grey'))
             patch.set_alpha(0.4)
 
-        if v.get_label_by_id('100'): v.get_label_by_id('100').set_text(a - b - c if a-b-c else '')
-        if v.get_label_by_id('010'): v.get_label_by_id('010').set_text(b - a - c if b-a-c else '')
-        if v.get_label_by_id('001'): v.get_label_by_id('001').set_text(c - a - b if c-a-b else '')
-        if v.get_label_by_id('110'): v.get_label_by_id('110').set_text((a & b) - c if (a&b)-c else '')
-        if v.get_label_by_id('101'): v.get_label_by_id('101').set_text((a & c) - b if (a&c)-b else '')
-        if v.get_label_by_id('011'): v.get_label_by_id('011').set_text((b & c) - a if (b&c)-a else '')
-        if v.get_label_by_id('111'): v.get_label_by_id('111').set_text(a & b & c if a&b&c else '')
+        for id_ in region_ids:
+            if v.get_label_by_id(id_): v.get_label_by_id(id_).set_text(region_texts.get(region_mask(id_), ''))
 
         if op == "union":
             color_map_union = {'100': PALETTE[0], '010': PALETTE[1], '001': PALETTE[2], '110': PALETTE[3], '101': PALETTE[4], '011': PALETTE[5], '111': PALETTE[6]}
             for id_, patch in patches.items():
                 patch.set_color(color_map_union.get(id_, 'grey'))
                 patch.set_alpha(alpha)
-            plot_title = f"Union (Highlighted): {result}"
+            plot_title = f"Union (Highlighted): {result_text}"
         elif op == "intersection":
              if patches.get('111'): patches['111'].set_color(HIGHLIGHT_INTERSECTION); patches['111'].set_alpha(alpha+0.1)
-             plot_title = f"Intersection (Highlighted): {result}"
+             plot_title = f"Intersection (Highlighted): {result_text}"
 
     # --- Supervenn (4 to 6 sets) ---
-    elif SUPERVENN_AVAILABLE and 4 <= num_sets_in_plot <= 6:
+    elif 4 <= num_sets_in_plot <= 6:
         print(f"{YELLOW}Generating Supervenn diagram (may take a moment)...{RESET}")
         try:
-            set_labels = [f"Set_{i+1}" for i in range(len(sets))]  # Adjust labels to start from Set_1
-            supervenn(sets, set_annotations=set_labels)
-            result_str = str(result)
-            max_title_len = 80 # Max chars for result in title before truncating
-            if len(result_str) > max_title_len:
-                 result_str = result_str[:max_title_len - 3] + "..." # Truncate long results
+            if not any(sets):
+                raise ValueError("All sets are empty")
+            set_labels = default_labels if labels else [f"Set_{i+1}" for i in range(len(sets))]  # Adjust labels to start from Set_1
+            supervenn([as_python_set(s) for s in sets], set_annotations=set_labels)
+            result_str = summarize_set(result, "title") # Bounded summary of the result
 
             # Create a title with operation and result on separate lines
-            title_text = f"{operation.capitalize()}\nResult: {result_str}" # Capitalize op name
+            title_text = f"{operation.capitalize()} ({len(count_regions(sets))} non-empty regions)\nResult: {result_str}" # Capitalize op name
             plt.suptitle(title_text, fontsize=12) # Add result clearly in the super title
 
             # Adjust layout AFTER drawing and titling
@@ -200,29 +1975,294 @@ def plot_sets(sets, operation, result, set_indices=None):
         except Exception as e:
              print(f"{RED}Error generating Supervenn diagram: {e}{RESET}")
              print(f"{YELLOW}Displaying result textually.{RESET}")
-             print(f"{operation} Result: {result}")
+             print(f"{operation} Result: {summarize_set(result)}")
              plt.close() 
              return # Exit plotting function
         
     
     plt.title(plot_title)
-    plt.show() # Show the plot for venn2/venn3/supervenn if successful
+    return finish_figure(operation, save_path) # Show or save the plot for venn2/venn3/supervenn if successful
+
+@profiled("plot")
+def plot_intersection_matrix(sets, operation, result, labels, save_path=None, top_k=None):
+    """UpSet-style view: bars for the top-k non-empty intersections plus a membership matrix.
+
+    Only region sizes are needed (count_regions), and only the regions that actually
+    occur are considered, so this scales to dozens of sets without enumerating 2^n masks.
+    """
+    top_k = top_k or RENDER_SETTINGS["matrix_top_k"]
+    num_sets = len(sets)
+    if SKETCH_SETTINGS["enabled"]:
+        counts = {mask: round(estimate) for mask, (estimate, _) in estimate_regions(sets)["regions"].items()}
+    else:
+        counts = count_regions(sets)
+    if not counts:
+        print(f"{YELLOW}⚠ All sets are empty; nothing to plot.{RESET}")
+        print(f"{operation} Result: {summarize_set(result)}")
+        return None
+    top = nlargest(top_k, counts.items(), key=lambda item: item[1])
+    full_mask = (1 << num_sets) - 1
+    op = operation.lower()
+
+    load_plotting()
+    fig = plt.figure(figsize=(max(8, 0.45 * len(top) + 3), 4 + 0.28 * num_sets))
+    grid = fig.add_gridspec(2, 2, width_ratios=[1, 4], height_ratios=[2, max(1, num_sets / 6)],
+                            wspace=0.05, hspace=0.05)
+    ax_bars = fig.add_subplot(grid[0, 1])
+    ax_matrix = fig.add_subplot(grid[1, 1], sharex=ax_bars)
+    ax_sizes = fig.add_subplot(grid[1, 0], sharey=ax_matrix)
+
+    # Intersection size bars (highlight the regions the operation is about)
+    xs = range(len(top))
+    colors = []
+    for mask, _ in top:
+        if op == "union" or (op == "intersection" and mask == full_mask):
+            colors.append(HIGHLIGHT_INTERSECTION)
+        else:
+            colors.append(PALETTE[1])
+    ax_bars.bar(xs, [size for _, size in top], color=colors)
+    for x, (_, size) in zip(xs, top):
+        ax_bars.annotate(f"{size:,}", (x, size), ha="center", va="bottom", fontsize=7)
+    ax_bars.set_ylabel("Intersection size")
+    ax_bars.tick_params(axis="x", labelbottom=False)
+
+    # Membership dots: filled when the region lies inside the set, joined by a line
+    ax_matrix.scatter([x for x in xs for _ in range(num_sets)], [i for _ in xs for i in range(num_sets)],
+                      color="#DDDDDD", s=30)
+    for x, (mask, _) in zip(xs, top):
+        members = [i for i in range(num_sets) if mask >> i & 1]
+        ax_matrix.scatter([x] * len(members), members, color="black", s=30, zorder=3)
+        if len(members) > 1:
+            ax_matrix.plot([x, x], [min(members), max(members)], color="black", zorder=2)
+    ax_matrix.set_yticks(range(num_sets))
+    ax_matrix.set_yticklabels(labels, fontsize=8)
+    ax_matrix.tick_params(axis="y", labelleft=False, labelright=True, left=False)
+    ax_matrix.set_xticks([])
+    ax_matrix.invert_yaxis()
+
+    # Set sizes, drawn leftwards
+    ax_sizes.barh(range(num_sets), [len(s) for s in sets], color=PALETTE[0])
+    ax_sizes.invert_xaxis()
+    ax_sizes.set_xlabel("Set size")
+    ax_sizes.tick_params(axis="y", left=False, labelleft=False)
+
+    shown = f"top {len(top)} of {len(counts):,}" if len(top) < len(counts) else f"all {len(counts)}"
+    ax_bars.set_title(f"{operation}: {summarize_set(result, 'title')}\n({shown} non-empty intersections)")
+    return finish_figure(operation, save_path)
+
+@profiled("plot")
+def plot_similarity_heatmap(similarity, labels, metric="jaccard", save_path=None):
+    """Draws one similarity matrix (jaccard, overlap or intersection) as a heatmap."""
+    load_plotting()
+    n = len(labels)
+    size = min(16, 4 + 0.25 * n)
+    fig, ax = plt.subplots(figsize=(size + 1.5, size))
+    image = ax.imshow(similarity[metric], cmap="viridis", interpolation="nearest",
+                      vmin=0, vmax=None if metric == "intersection" else 1)
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04, label=metric.capitalize())
+    if n <= 40: # Tick labels stay readable up to a few dozen sets
+        ax.set_xticks(range(n))
+        ax.set_xticklabels(labels, rotation=90, fontsize=8)
+        ax.set_yticks(range(n))
+        ax.set_yticklabels(labels, fontsize=8)
+    plt.title(f"All-Pairs {metric.capitalize()} ({n} sets)")
+    return finish_figure(f"similarity {metric}", save_path)
+
+@profiled("plot")
+def plot_complement(universal_set, set_a, label, save_path=None):
+    """Plots U and one set with the complement U - A highlighted."""
+    load_plotting()
+    plt.figure(figsize=(7, 7))
+    sizes, region_texts = region_sizes_and_labels([universal_set, set_a])
+    subsets_data = {region_id(mask, 2): size for mask, size in sizes.items()}
+    v = venn2(subsets=subsets_data, set_labels=('Universal Set U', label))
+
+    if v.get_label_by_id('10'): v.get_label_by_id('10').set_text(region_texts.get(0b01, ''))
+    if v.get_label_by_id('01'): v.get_label_by_id('01').set_text('')
+    if v.get_label_by_id('11'): v.get_label_by_id('11').set_text(region_texts.get(0b11, ''))
+
+    patch_10 = v.get_patch_by_id('10')
+    if patch_10:
+        patch_10.set_color(HIGHLIGHT_COMPLEMENT)
+        patch_10.set_alpha(0.7)
+
+    patch_11 = v.get_patch_by_id('11')
+    if patch_11:
+         patch_11.set_color(PALETTE[1])
+         patch_11.set_alpha(0.5)
+
+    plt.title(f"Complement of {label} = U - {label}")
+    return finish_figure(f"Complement {label}", save_path)
+
+# --- Headless Rendering ---
+# With --headless, figures are written to files through the non-interactive Agg backend
+# instead of opening a window. Batch job lists are rendered in parallel by a process
+# pool whose workers receive the sets once, at start-up, and are reused for every job.
+
+RENDER_SETTINGS = {"headless": False, "output_dir": ".", "format": "png", "count": 0,
+                   "matrix_top_k": 30} # Intersections shown by the intersection-matrix view
+
+def enable_headless(output_dir=".", image_format="png"):
+    """Switches to the Agg backend so figures are saved to files instead of shown."""
+    if plt is not None:
+        plt.switch_backend("Agg")
+    os.makedirs(output_dir, exist_ok=True)
+    RENDER_SETTINGS.update(headless=True, output_dir=output_dir, format=image_format)
+
+def _auto_path(name):
+    RENDER_SETTINGS["count"] += 1
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_").lower()[:40] or "figure"
+    filename = f"{RENDER_SETTINGS['count']:04d}_{slug}.{RENDER_SETTINGS['format']}"
+    return os.path.join(RENDER_SETTINGS["output_dir"], filename)
+
+def finish_figure(name, save_path=None):
+    """Shows the current figure, or saves and closes it when rendering headless."""
+    if save_path is None and not RENDER_SETTINGS["headless"]:
+        with PROFILER.stage("render"):
+            plt.show()
+        return None
+    save_path = save_path or _auto_path(name)
+    with PROFILER.stage("render"):
+        plt.savefig(save_path, bbox_inches="tight")
+        plt.close("all")
+    print(f"{GREEN}Saved diagram to {save_path}{RESET}")
+    return save_path
+
+BATCH_OPERATIONS = ("overview", "union", "intersection", "difference", "symmetric difference",
+                    "subset", "complement", "expression")
+
+def render_job(job, universal_set, sets, labels, save_path):
+    """Computes and renders one batch job; returns the saved path (or None).
+
+    A job is a dict such as {"operation": "difference", "sets": [1, 2]} where set numbers
+    are 1-based as in the menu. Operations: overview, union, intersection, difference,
+    symmetric difference, subset, complement, and expression (with an "expr" key).
+    """
+    operation = job.get("operation", "overview").lower()
+    if operation not in BATCH_OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    indices = [i - 1 for i in job.get("sets", range(1, len(sets) + 1))]
+    for i in indices:
+        if not 0 <= i < len(sets):
+            raise ValueError(f"Invalid set number: {i + 1}")
+    chosen = [sets[i] for i in indices]
+    if operation == "overview":
+        return plot_sets(chosen, "All Sets Overview", "N/A - Showing set composition", indices, labels, save_path)
+    if operation in ("union", "intersection"):
+        result = union(chosen) if operation == "union" else intersection(chosen)
+        return plot_sets(chosen, operation.capitalize(), result, indices, labels, save_path)
+    if operation == "complement":
+        return plot_complement(universal_set, chosen[0], labels[indices[0]], save_path)
+    if operation == "expression":
+        result, tree = run_expression(job["expr"], sets, universal_set, labels)
+        used = expression_sets(tree)
+        return plot_sets([sets[i] for i in used], job["expr"], result, used, labels, save_path)
+    if len(chosen) != 2:
+        raise ValueError(f"'{operation}' needs exactly 2 sets")
+    a, b = chosen
+    if operation == "difference":
+        return plot_sets(chosen, "Difference", difference(a, b), indices, labels, save_path)
+    if operation == "symmetric difference":
+        return plot_sets(chosen, "Symmetric Difference", symmetric_difference(a, b), indices, labels, save_path)
+    title = f"Subset Check: {labels[indices[0]]} vs {labels[indices[1]]}"
+    return plot_sets(chosen, title, f"Result: {check_subset(a, b)}", indices, labels, save_path)
+
+_worker_state = {}
+
+def _worker_settings():
+    """Command-line settings a render worker needs, since spawned workers start from the defaults."""
+    return {"sketch": dict(SKETCH_SETTINGS), "summary": dict(SUMMARY_LIMITS), "shard": dict(SHARD_SETTINGS),
+            "matrix_top_k": RENDER_SETTINGS["matrix_top_k"], "cache_bytes": RESULT_CACHE.max_bytes}
+
+def _init_render_worker(universal_set, sets, labels, image_format, dictionary=None, settings=None):
+    global ELEMENT_DICTIONARY
+    ELEMENT_DICTIONARY = dictionary # Needed to decode labels and titles
+    if settings:
+        SKETCH_SETTINGS.update(settings["sketch"])
+        SUMMARY_LIMITS.update(settings["summary"])
+        SHARD_SETTINGS.update(settings["shard"])
+        RENDER_SETTINGS["matrix_top_k"] = settings["matrix_top_k"]
+        RESULT_CACHE.max_bytes = settings["cache_bytes"]
+    RENDER_SETTINGS.update(headless=True, format=image_format)
+    load_plotting().switch_backend("Agg")
+    _worker_state.update(universal_set=universal_set, sets=sets, labels=labels)
+
+def _render_in_worker(args):
+    job, save_path = args
+    try:
+        return render_job(job, _worker_state["universal_set"], _worker_state["sets"],
+                          _worker_state["labels"], save_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def load_batch_jobs(path):
+    """Reads a JSON list of job dicts (see render_job)."""
+    with open(path) as f:
+        jobs = json.load(f)
+    if not isinstance(jobs, list):
+        raise ValueError(f"{path}: expected a JSON list of jobs")
+    return jobs
+
+def _job_error(job):
+    """Describes what is wrong with the shape of a batch job, or returns None."""
+    if not isinstance(job, dict):
+        return f"TypeError: a job must be a JSON object, not {type(job).__name__}"
+    for key in ("operation", "output", "expr"):
+        if key in job and not isinstance(job[key], str):
+            return f"TypeError: '{key}' must be a string, not {type(job[key]).__name__}"
+    return None
+
+def render_batch(jobs, universal_set, sets, labels, output_dir=".", image_format="png", workers=None):
+    """Renders every job to a file, in parallel across `workers` processes.
+
+    Each job may set "output" (a file name, relative to output_dir); otherwise files are
+    numbered in job order. Returns a list of (path, error) tuples in job order; malformed
+    jobs are reported there without being rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    outcomes = [(None, _job_error(job)) for job in jobs]
+    tasks = []
+    for n, job in enumerate(jobs, start=1):
+        if outcomes[n - 1][1] is None:
+            name = job.get("output") or f"{n:04d}_{re.sub(r'[^A-Za-z0-9]+', '_', job.get('operation', 'overview')).lower()}.{image_format}"
+            tasks.append((n - 1, (job, os.path.join(output_dir, name))))
+    workers = workers or os.cpu_count() or 1
+    init_args = (universal_set, sets, labels, image_format, ELEMENT_DICTIONARY, _worker_settings())
+    rendered = []
+    if workers == 1 and tasks: # Render here, then give the caller its plotting state back
+        backend, settings = load_plotting().get_backend(), dict(RENDER_SETTINGS)
+        try:
+            _init_render_worker(*init_args)
+            rendered = [_render_in_worker(task) for _, task in tasks]
+        finally:
+            RENDER_SETTINGS.update(settings)
+            _worker_state.clear()
+            if plt.get_backend() != backend:
+                plt.switch_backend(backend)
+    elif tasks:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, initargs=init_args) as pool:
+            rendered = list(pool.map(_render_in_worker, [task for _, task in tasks],
+                                     chunksize=max(1, len(tasks) // (workers * 4))))
+    for (index, _), outcome in zip(tasks, rendered):
+        outcomes[index] = outcome
+    return outcomes
 
 # --- Decorated Menu Function ---
-def display_menu_unicode_color(sets, universal_set):
+@profiled("menu")
+def display_menu_unicode_color(sets, universal_set, labels=None):
     """Displays the main menu with Unicode box characters and colors."""
     # --- Prepare menu content ---
     lines = []
     lines.append(f"{BOLD}{YELLOW}SET OPERATIONS MENU{RESET}") # Title
     lines.append("SEPARATOR") # Placeholder for separator logic
     lines.append(f"{CYAN}Defined Sets:{RESET}")
-    lines.append(f"  {MAGENTA}Universal Set U:{RESET} {universal_set}")
+    lines.append(f"  {MAGENTA}Universal Set U:{RESET} {summarize_set(universal_set, 'menu')}")
     for i, s in enumerate(sets, start=1):
-        # Ensure set string representation doesn't get too long for reasonable display
-        set_str = str(s)
-        if len(set_str) > 60: # Truncate long set strings for menu display
-             set_str = set_str[:57] + "..."
-        lines.append(f"  {MAGENTA}Set {i}:{RESET}           {set_str}")
+        # Only the first few elements are formatted, so long sets stay cheap to display
+        set_str = summarize_set(s, "menu")
+        name = f"{labels[i-1] if labels else f'Set {i}'}:".ljust(17)
+        lines.append(f"  {MAGENTA}{name}{RESET}{set_str}")
     lines.append("SEPARATOR")
     lines.append(f"{CYAN}Options:{RESET}")
     lines.append(f"  {GREEN}1.{RESET} Show Sets Diagram")
@@ -232,7 +2272,11 @@ def display_menu_unicode_color(sets, universal_set):
     lines.append(f"  {GREEN}5.{RESET} Symmetric Difference (Set A Δ Set B)")
     lines.append(f"  {GREEN}6.{RESET} Check Subset (Set A ⊆ Set B)")
     lines.append(f"  {GREEN}7.{RESET} Complement (of a set w.r.t. U)")
-    lines.append(f"  {GREEN}8.{RESET} Exit")
+    lines.append(f"  {GREEN}8.{RESET} Evaluate Set Expression (e.g. (S1 & S2) - ~S3)")
+    lines.append(f"  {GREEN}9.{RESET} Similarity Matrix (all pairs of sets)")
+    lines.append(f"  {GREEN}10.{RESET} Save Session (to a binary file)")
+    lines.append(f"  {GREEN}11.{RESET} Edit a Set (add / remove / replace elements)")
+    lines.append(f"  {GREEN}12.{RESET} Exit")
 
     # --- Calculate Width (Ignoring color codes) ---
     def get_text_length(text):
@@ -281,158 +2325,408 @@ def display_menu_unicode_color(sets, universal_set):
 
 # --- Main Program Logic ---
 
-print(f"{BOLD}{YELLOW}--- Set Theory Visualizer ---{RESET}")
-
-# User input for universal set
-universal_set = get_set_input("Enter elements of the Universal Set U (space-separated integers): ")
-# print(f"Universal Set U: {universal_set}") # Displayed in menu now
-
-# User input for defining sets
-while True:
-    try:
-        num_sets_input = input(f"{CYAN}Enter the number of sets you want to work with (e.g., 2,4 ..): {RESET}")
-        num_sets = int(num_sets_input)
-        if num_sets < 1:
-             print(f"{RED}Please enter at least 1 set.{RESET}")
-        elif num_sets > 6 and not SUPERVENN_AVAILABLE:
-             print(f"{YELLOW}Warning: Visualization requires 'supervenn' for > 3 sets. Proceeding without graphs for {num_sets} sets.{RESET}")
-             break
-        elif num_sets > 6:
-             print(f"{YELLOW}Warning: Visualization for {num_sets} sets can be complex. Proceeding with 'supervenn'.{RESET}")
-             break
+def check_startup():
+    """Reports module import + setup time for the text-only path against the budget."""
+    elapsed = time.perf_counter() - _MODULE_LOAD_START
+    heavy = [name for name in ("matplotlib", "matplotlib_venn", "supervenn", "numpy") if name in sys.modules]
+    ok = elapsed <= STARTUP_BUDGET_SECONDS and not heavy
+    color = GREEN if ok else RED
+    print(f"{color}Startup: {elapsed * 1000:.1f} ms (budget {STARTUP_BUDGET_SECONDS * 1000:.0f} ms); "
+          f"eager heavy imports: {', '.join(heavy) or 'none'}{RESET}")
+    return 0 if ok else 1
+
+def build_arg_parser():
+    """Builds the command-line interface of the visualizer."""
+    parser = argparse.ArgumentParser(description="Set Theory Visualizer")
+    parser.add_argument("--engine", choices=["set", "bitmap"], default="set",
+                        help="Set representation: Python sets (default) or NumPy bitmaps over U.")
+    parser.add_argument("--universe", metavar="FILE",
+                        help="Load the Universal Set from a file instead of the prompt.")
+    parser.add_argument("--set", dest="set_files", metavar="FILE", action="append", default=[],
+                        help="Load working set(s) from a file; repeat for several files.")
+    parser.add_argument("--strings", action="store_true",
+                        help="Treat elements as string tokens (IDs, SKUs, hostnames), interned as integer IDs.")
+    parser.add_argument("--format", choices=["auto", "lines", "csv", "binary"], default="auto",
+                        help="Input file format (default: guess from extension).")
+    parser.add_argument("--csv-layout", choices=["columns", "labels"], default="columns",
+                        help="CSV layout: one set per column, or 'label,element' rows.")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_BYTES / 2**20,
+                        help="Memory budget for cached operation results in MiB (0 disables caching).")
+    parser.add_argument("--headless", action="store_true",
+                        help="Save diagrams to files (non-interactive backend) instead of opening windows.")
+    parser.add_argument("--output-dir", default=".", help="Directory for headless and batch diagrams.")
+    parser.add_argument("--image-format", choices=["png", "svg", "pdf"], default="png",
+                        help="File format for headless and batch diagrams.")
+    parser.add_argument("--batch", metavar="JOBS.json",
+                        help="Render a JSON list of jobs (operation and set numbers per entry) and exit.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for batch rendering and --sharded execution (default: one per core).")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Count Venn regions of large integer sets across --workers processes, "
+                             "range-partitioned through shared memory.")
+    parser.add_argument("--max-elements", type=int, default=None,
+                        help="Max elements shown when printing a result set (default: 1000).")
+    parser.add_argument("--max-label-elements", type=int, default=None,
+                        help="Max elements shown in diagram labels, titles and the menu.")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help=f"Intersections shown in the matrix view used above 6 sets (default: {RENDER_SETTINGS['matrix_top_k']}).")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate region, union and intersection sizes from HyperLogLog/MinHash sketches.")
+    parser.add_argument("--sketch-size", type=int, default=SKETCH_SETTINGS["k"],
+                        help="MinHash sample size per set in approximate mode.")
+    parser.add_argument("--hll-precision", type=int, choices=range(4, 19), default=SKETCH_SETTINGS["precision"],
+                        metavar="P", help="HyperLogLog uses 2^P registers in approximate mode (4-18).")
+    parser.add_argument("--similarity", action="store_true",
+                        help="Print the all-pairs similarity table, save/show its heatmap and exit.")
+    parser.add_argument("--profile", nargs="?", const="", metavar="TRACE_FILE",
+                        help="Time each stage and record peak memory; print one JSON trace record per operation "
+                             "(or append them to TRACE_FILE) and a summary at exit.")
+    parser.add_argument("--save-session", metavar="FILE",
+                        help="Save U, the sets and their labels to a binary session file after loading them.")
+    parser.add_argument("--load-session", metavar="FILE",
+                        help="Load U, the sets and labels from a session file (memory-mapped with NumPy).")
+    parser.add_argument("--startup-check", action="store_true",
+                        help=f"Report text-only startup time and fail if it exceeds {STARTUP_BUDGET_SECONDS}s.")
+    parser.add_argument("--expr", metavar="EXPRESSION", action="append", default=[],
+                        help="Evaluate a set expression such as '(S1 & S3) - ~S2', print it and exit.")
+    return parser
+
+def main(argv=None):
+    """Runs the visualizer and returns a process exit code.
+
+    Applies the command-line settings, then hands over to run_session(); with --profile,
+    the profile summary is printed however the session ends.
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.sketch_size < 1:
+        parser.error("--sketch-size must be at least 1.")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    for option, value in (("--max-elements", args.max_elements), ("--max-label-elements", args.max_label_elements)):
+        if value is not None and value < 1:
+            parser.error(f"{option} must be at least 1.")
+    if args.startup_check:
+        return check_startup()
+    RESULT_CACHE.max_bytes = int(args.cache_mb * 2**20)
+    if args.approximate:
+        if numpy_available():
+            SKETCH_SETTINGS.update(enabled=True, k=args.sketch_size, precision=args.hll_precision)
+        else:
+            print(f"{YELLOW}Warning: NumPy not found. Approximate mode is unavailable (pip install numpy).{RESET}")
+    if args.strings:
+        enable_element_dictionary()
+    if args.sharded:
+        if numpy_available():
+            SHARD_SETTINGS.update(enabled=True, workers=args.workers)
         else:
-            break # Exit loop if valid number is entered
-    except ValueError:
-        print(f"{RED}Invalid input. Please enter an integer.{RESET}")
+            print(f"{YELLOW}Warning: NumPy not found. Sharded execution is unavailable (pip install numpy).{RESET}")
+    if args.top_k:
+        RENDER_SETTINGS["matrix_top_k"] = args.top_k
+    configure_summary("print", args.max_elements)
+    for context in ("label", "title", "menu"):
+        configure_summary(context, args.max_label_elements)
+    if args.headless or args.batch:
+        enable_headless(args.output_dir, args.image_format)
+    if args.profile is not None:
+        PROFILER.enable(args.profile or None)
+    try:
+        return run_session(args, parser)
+    finally:
+        if PROFILER.enabled:
+            PROFILER.end()
+            print(PROFILER.summary())
+            PROFILER.disable()
+
+def save_session_to(path, universal_set, sets, labels):
+    """Saves the session and reports the outcome; returns True on success."""
+    try:
+        size = save_session(path, universal_set, sets, labels)
+    except (OSError, ValueError) as e:
+        print(f"{RED}Could not save session: {e}{RESET}")
+        return False
+    print(f"{GREEN}Saved session to {path} ({size:,} bytes).{RESET}")
+    return True
+
+MENU_OPERATIONS = {1: "Show Sets Diagram", 2: "Union", 3: "Intersection", 4: "Difference",
+                   5: "Symmetric Difference", 6: "Subset Check", 7: "Complement",
+                   8: "Set Expression", 9: "Similarity Matrix", 10: "Save Session",
+                   11: "Edit a Set", 12: "Exit"}
+
+def run_session(args, parser):
+    """Loads the sets and runs the non-interactive modes or the interactive menu loop."""
+    print(f"{BOLD}{YELLOW}--- Set Theory Visualizer ---{RESET}")
+    PROFILER.begin("Load Sets")
+
+    # Bulk-load sets from files when given, otherwise fall back to the prompts
+    sets = []
+    labels = []
+    if args.load_session and (args.universe or args.set_files):
+        parser.error("--load-session cannot be combined with --universe or --set.")
+    try:
+        if args.load_session:
+            universal_set, sets, labels = load_session(args.load_session)
+            print(f"{GREEN}Loaded session from {args.load_session} (U with {len(universal_set)} elements, {len(sets)} set(s)).{RESET}")
+        if args.universe:
+            universal_set = set().union(*(s for _, s in load_sets(args.universe, args.format, args.csv_layout)))
+            print(f"{GREEN}Loaded Universal Set U from {args.universe} ({len(universal_set)} elements).{RESET}")
+        for path in args.set_files:
+            for label, s in load_sets(path, args.format, args.csv_layout):
+                labels.append(label)
+                sets.append(s)
+                print(f"{GREEN}Loaded {label} from {path} ({len(s)} elements).{RESET}")
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    # User input for universal set
+    if not (args.universe or args.load_session):
+        universal_set = get_set_input(f"Enter elements of the Universal Set U ({element_hint()}): ")
+    # print(f"Universal Set U: {universal_set}") # Displayed in menu now
+
+    # User input for defining sets
+    while not (args.set_files or args.load_session):
+        try:
+            num_sets_input = input(f"{CYAN}Enter the number of sets you want to work with (e.g., 2,4 ..): {RESET}")
+            num_sets = int(num_sets_input)
+            if num_sets < 1:
+                 print(f"{RED}Please enter at least 1 set.{RESET}")
+            elif num_sets > 6:
+                 print(f"{YELLOW}Note: {num_sets} sets will be drawn as an intersection matrix (top {RENDER_SETTINGS['matrix_top_k']} intersections).{RESET}")
+                 break
+            else:
+                break # Exit loop if valid number is entered
+        except ValueError:
+            print(f"{RED}Invalid input. Please enter an integer.{RESET}")
 
-sets = []
-for i in range(num_sets):
-    sets.append(get_set_input(f"Enter elements of Set {i+1} (space-separated integers): "))
+    if not (args.set_files or args.load_session):
+        for i in range(num_sets):
+            sets.append(get_set_input(f"Enter elements of Set {i+1} ({element_hint()}): "))
+            labels.append(f"Set {i+1}")
 
-# --- Main Interaction Loop ---
-while True:
-    # Display the decorated menu
-    display_menu_unicode_color(sets, universal_set)
+    if args.save_session:
+        save_session_to(args.save_session, universal_set, sets, labels)
 
-    try:
-        # Get user choice with styled prompt
-        choice_input = input(f"Enter your choice (1-8):{BOLD}{GREEN} >> {RESET} ")
-        choice = int(choice_input)
-
-        # --- Input Validation Helper for Set Indices ---
-        def get_valid_indices(num_required, op_name):
-            if len(sets) < num_required:
-                 print(f"{RED}Need at least {num_required} set(s) defined for {op_name}.{RESET}")
-                 return None # Indicate failure
-
-            while True:
-                prompt = f"{CYAN}Enter set number{'s' if num_required > 1 else ''} for {op_name} (e.g., {'1 2' if num_required == 2 else '1'}): {RESET}"
+    if args.engine == "bitmap":
+        if numpy_available():
+            universal_set, sets = encode_sets(universal_set, sets)
+            print(f"{GREEN}Using bitmap set engine ({len(universal_set)} elements in U).{RESET}")
+        else:
+            print(f"{YELLOW}Warning: NumPy not found. Falling back to Python sets (pip install numpy).{RESET}")
+    PROFILER.end()
+
+    # --- Non-interactive Expressions ---
+    if args.expr:
+        for text in args.expr:
+            PROFILER.begin(f"Expression: {text}")
+            try:
+                result, _ = run_expression(text, sets, universal_set, labels)
+                print(f"{text} = {summarize_set(result)}")
+            except ValueError as e:
+                print(f"{RED}Invalid expression {text!r}: {e}{RESET}")
+                return 1
+        return 0
+
+    # --- Non-interactive Similarity Matrix ---
+    if args.similarity:
+        if len(sets) < 2:
+            print(f"{RED}Need at least 2 sets for a similarity matrix.{RESET}")
+            return 1
+        PROFILER.begin("Similarity Matrix")
+        similarity = similarity_matrix(sets)
+        print(format_similarity_table(similarity, labels))
+        plot_similarity_heatmap(similarity, labels)
+        return 0
+
+    # --- Batch Rendering ---
+    if args.batch:
+        try:
+            jobs = load_batch_jobs(args.batch)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"{YELLOW}Rendering {len(jobs)} diagram(s)...{RESET}")
+        outcomes = render_batch(jobs, universal_set, sets, labels, args.output_dir, args.image_format, args.workers)
+        failed = 0
+        for n, (path, error) in enumerate(outcomes, start=1):
+            if error:
+                failed += 1
+                print(f"{RED}Job {n} failed: {error}{RESET}")
+            elif path is None:
+                print(f"{YELLOW}Job {n} produced no diagram.{RESET}")
+        print(f"{GREEN}Rendered {len(outcomes) - failed} of {len(outcomes)} job(s) into {args.output_dir}.{RESET}")
+        return 1 if failed else 0
+
+    # --- Main Interaction Loop ---
+    while True:
+        # Display the decorated menu
+        display_menu_unicode_color(sets, universal_set, labels)
+
+        try:
+            # Get user choice with styled prompt
+            choice_input = input(f"Enter your choice (1-12):{BOLD}{GREEN} >> {RESET} ")
+            choice = int(choice_input)
+            PROFILER.begin(MENU_OPERATIONS.get(choice, "Invalid Choice"))
+
+            # --- Input Validation Helper for Set Indices ---
+            @profiled("input")
+            def get_valid_indices(num_required, op_name):
+                if len(sets) < num_required:
+                     print(f"{RED}Need at least {num_required} set(s) defined for {op_name}.{RESET}")
+                     return None # Indicate failure
+
+                while True:
+                    prompt = f"{CYAN}Enter set number{'s' if num_required > 1 else ''} for {op_name} (e.g., {'1 2' if num_required == 2 else '1'}): {RESET}"
+                    try:
+                        indices_str = input(prompt).split()
+                        if len(indices_str) != num_required:
+                            print(f"{RED}Please enter exactly {num_required} space-separated number(s).{RESET}")
+                            continue
+
+                        indices = [int(s) - 1 for s in indices_str] # Convert to 0-based index
+
+                        valid = True
+                        for idx in indices:
+                            if not (0 <= idx < len(sets)):
+                                print(f"{RED}Invalid set number: {idx + 1}. Please choose between 1 and {len(sets)}.{RESET}")
+                                valid = False
+                                break
+                        if valid:
+                            return indices # Return list of 0-based indices
+
+                    except ValueError:
+                        print(f"{RED}Invalid input. Please enter integer numbers only.{RESET}")
+
+            # --- Menu Choice Handling ---
+            if choice == 1:
+                print(f"{YELLOW}Displaying defined sets diagram...{RESET}")
+                if not sets: print(f"{RED}No sets defined.{RESET}"); continue
+                plot_sets(sets, "All Sets Overview", "N/A - Showing set composition", labels=labels) # plot_sets handles checks
+
+            elif choice == 2: # Union
+                if not sets: print(f"{RED}No sets defined for Union.{RESET}"); continue
+                if SKETCH_SETTINGS["enabled"]:
+                    result = f"{format_estimate(*estimate_regions(sets)['union'])} elements (estimated)"
+                else:
+                    result = union(sets)
+                print(f"Union of all sets: {summarize_set(result)}")
+                plot_sets(sets, "Union", result, labels=labels)
+
+            elif choice == 3: # Intersection
+                if not sets: print(f"{RED}No sets defined for Intersection.{RESET}"); continue
+                if SKETCH_SETTINGS["enabled"]:
+                    result = f"{format_estimate(*estimate_intersection(sets))} elements (estimated)"
+                else:
+                    result = intersection(sets)
+                print(f"Intersection of all sets: {summarize_set(result)}")
+                plot_sets(sets, "Intersection", result, labels=labels)
+
+            elif choice == 4: # Difference
+                indices = get_valid_indices(2, "Difference (A - B)")
+                if indices:
+                    a_idx, b_idx = indices
+                    set_a, set_b = sets[a_idx], sets[b_idx]
+                    result = difference(set_a, set_b)
+                    print(f"Difference (Set {a_idx+1} - Set {b_idx+1}): {summarize_set(result)}")
+                    # Only plot the two relevant sets for Difference
+                    plot_sets([set_a, set_b], "Difference", result, set_indices=[a_idx, b_idx], labels=labels)
+
+            elif choice == 5: # Symmetric Difference
+                indices = get_valid_indices(2, "Symmetric Difference (A Δ B)")
+                if indices:
+                     a_idx, b_idx = indices
+                     set_a, set_b = sets[a_idx], sets[b_idx]
+                     result = symmetric_difference(set_a, set_b)
+                     print(f"Symmetric Difference (Set {a_idx+1} Δ Set {b_idx+1}): {summarize_set(result)}")
+                     # Only plot the two relevant sets
+                     plot_sets([set_a, set_b], "Symmetric Difference", result, set_indices=[a_idx, b_idx], labels=labels)
+
+            elif choice == 6: # Subset Check
+                 indices = get_valid_indices(2, "Subset Check (A ⊆ B)")
+                 if indices:
+                     a_idx, b_idx = indices
+                     set_a, set_b = sets[a_idx], sets[b_idx]
+                     is_subset = check_subset(set_a, set_b)
+                     print(f"Is Set {a_idx+1} a subset of Set {b_idx+1}? : {is_subset}")
+                     # Only plot the two relevant sets
+                     plot_sets([set_a, set_b], f"Subset Check: Set {a_idx+1} vs Set {b_idx+1}", f"Result: {is_subset}", set_indices=[a_idx, b_idx], labels=labels)
+
+            elif choice == 7: # Complement
+                indices = get_valid_indices(1, "Complement (U - A)")
+                if indices:
+                    a_idx = indices[0]
+                    set_a = sets[a_idx]
+                    result = complement(universal_set, set_a)
+                    print(f"Complement of Set {a_idx+1} (U - Set {a_idx+1}): {summarize_set(result)}")
+
+                    # Complement visualization uses venn2 directly, not plot_sets
+                    plot_complement(universal_set, set_a, labels[a_idx])
+
+            elif choice == 8: # Set Expression
+                if not sets: print(f"{RED}No sets defined for expressions.{RESET}"); continue
+                text = input(f"{CYAN}Enter a set expression using S1..S{len(sets)}, U, ~, -, &, ^, |: {RESET}")
                 try:
-                    indices_str = input(prompt).split()
-                    if len(indices_str) != num_required:
-                        print(f"{RED}Please enter exactly {num_required} space-separated number(s).{RESET}")
-                        continue
-
-                    indices = [int(s) - 1 for s in indices_str] # Convert to 0-based index
-
-                    valid = True
-                    for idx in indices:
-                        if not (0 <= idx < len(sets)):
-                            print(f"{RED}Invalid set number: {idx + 1}. Please choose between 1 and {len(sets)}.{RESET}")
-                            valid = False
-                            break
-                    if valid:
-                        return indices # Return list of 0-based indices
+                    result, tree = run_expression(text, sets, universal_set, labels)
+                except ValueError as e:
+                    print(f"{RED}Invalid expression: {e}{RESET}")
+                    continue
+                print(f"{text.strip()} = {summarize_set(result)}")
+                indices = expression_sets(tree)
+                if 2 <= len(indices):
+                    plot_sets([sets[i] for i in indices], text.strip(), result, set_indices=indices, labels=labels)
+
+            elif choice == 9: # Similarity Matrix
+                if len(sets) < 2: print(f"{RED}Need at least 2 sets for a similarity matrix.{RESET}"); continue
+                similarity = similarity_matrix(sets)
+                print(format_similarity_table(similarity, labels))
+                plot_similarity_heatmap(similarity, labels)
+
+            elif choice == 10: # Save Session
+                path = input(f"{CYAN}Save session to file (default session.setviz): {RESET}").strip() or "session.setviz"
+                save_session_to(path, universal_set, sets, labels)
+
+            elif choice == 11: # Edit a Set
+                indices = get_valid_indices(1, "Edit")
+                if indices:
+                    a_idx = indices[0]
+                    action = input(f"{CYAN}(a)dd, (r)emove or re(p)lace elements of {labels[a_idx]}? {RESET}").strip().lower()[:1]
+                    if action not in ("a", "r", "p"):
+                        print(f"{RED}Invalid action. Please enter a, r or p.{RESET}"); continue
+                    try:
+                        elements = parse_set_input(input(f"{CYAN}Elements ({element_hint()}): {RESET}"))
+                    except ValueError:
+                        print(f"{RED}Invalid input. Please enter {element_hint()} only.{RESET}"); continue
+                    try:
+                        live = track_sets(sets)
+                    except TypeError as e:
+                        print(f"{RED}{e}{RESET}"); continue
+                    if action == "a":
+                        print(f"Added {live.add(a_idx, elements)} element(s) to {labels[a_idx]}.")
+                    elif action == "r":
+                        print(f"Removed {live.remove(a_idx, elements)} element(s) from {labels[a_idx]}.")
+                    else:
+                        added, removed = live.replace(a_idx, elements)
+                        print(f"Replaced {labels[a_idx]}: {added} element(s) added, {removed} removed.")
+                    print(f"{labels[a_idx]} now has {len(sets[a_idx]):,} elements; union {len(live.union_set):,}, "
+                          f"intersection {live.sizes.get(live.full_mask, 0):,}, {len(live.sizes)} non-empty region(s).")
+
+            elif choice == 12: # Exit
+                print(f"\n{YELLOW}Exiting...{RESET}")
+                stats = RESULT_CACHE.stats()
+                print(f"{CYAN}Result cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions.{RESET}")
+                print(f"{YELLOW}Thank you for using the Set Theory Visualizer!{RESET}")
+                if plt is not None:
+                    plt.close('all')
+                break
+            else:
+                print(f"{RED}Invalid choice. Please enter a number between 1 and 12.{RESET}")
 
-                except ValueError:
-                    print(f"{RED}Invalid input. Please enter integer numbers only.{RESET}")
-
-        # --- Menu Choice Handling ---
-        if choice == 1:
-            print(f"{YELLOW}Displaying defined sets diagram...{RESET}")
-            if not sets: print(f"{RED}No sets defined.{RESET}"); continue
-            plot_sets(sets, "All Sets Overview", "N/A - Showing set composition") # plot_sets handles checks
-
-        elif choice == 2: # Union
-            if not sets: print(f"{RED}No sets defined for Union.{RESET}"); continue
-            result = union(sets)
-            print(f"Union of all sets: {result}")
-            plot_sets(sets, "Union", result)
-
-        elif choice == 3: # Intersection
-            if not sets: print(f"{RED}No sets defined for Intersection.{RESET}"); continue
-            result = intersection(sets)
-            print(f"Intersection of all sets: {result}")
-            plot_sets(sets, "Intersection", result)
-
-        elif choice == 4: # Difference
-            indices = get_valid_indices(2, "Difference (A - B)")
-            if indices:
-                a_idx, b_idx = indices
-                set_a, set_b = sets[a_idx], sets[b_idx]
-                result = difference(set_a, set_b)
-                print(f"Difference (Set {a_idx+1} - Set {b_idx+1}): {result}")
-                # Only plot the two relevant sets for Difference
-                plot_sets([set_a, set_b], "Difference", result, set_indices=[a_idx, b_idx])
-
-        elif choice == 5: # Symmetric Difference
-            indices = get_valid_indices(2, "Symmetric Difference (A Δ B)")
-            if indices:
-                 a_idx, b_idx = indices
-                 set_a, set_b = sets[a_idx], sets[b_idx]
-                 result = symmetric_difference(set_a, set_b)
-                 print(f"Symmetric Difference (Set {a_idx+1} Δ Set {b_idx+1}): {result}")
-                 # Only plot the two relevant sets
-                 plot_sets([set_a, set_b], "Symmetric Difference", result, set_indices=[a_idx, b_idx])
-
-        elif choice == 6: # Subset Check
-             indices = get_valid_indices(2, "Subset Check (A ⊆ B)")
-             if indices:
-                 a_idx, b_idx = indices
-                 set_a, set_b = sets[a_idx], sets[b_idx]
-                 is_subset = check_subset(set_a, set_b)
-                 print(f"Is Set {a_idx+1} a subset of Set {b_idx+1}? : {is_subset}")
-                 # Only plot the two relevant sets
-                 plot_sets([set_a, set_b], f"Subset Check: Set {a_idx+1} vs Set {b_idx+1}", f"Result: {is_subset}", set_indices=[a_idx, b_idx])
-
-        elif choice == 7: # Complement
-            indices = get_valid_indices(1, "Complement (U - A)")
-            if indices:
-                a_idx = indices[0]
-                set_a = sets[a_idx]
-                result = complement(universal_set, set_a)
-                print(f"Complement of Set {a_idx+1} (U - Set {a_idx+1}): {result}")
-
-                # Complement visualization uses venn2 directly, not plot_sets
-                plt.figure(figsize=(7, 7))
-                v = venn2([universal_set, set_a], set_labels=('Universal Set U', f'Set {a_idx+1}'))
-
-                if v.get_label_by_id('10'): v.get_label_by_id('10').set_text(result if result else '')
-                if v.get_label_by_id('01'): v.get_label_by_id('01').set_text('')
-                if v.get_label_by_id('11'): v.get_label_by_id('11').set_text(set_a & universal_set if set_a & universal_set else '')
-
-                patch_10 = v.get_patch_by_id('10')
-                if patch_10:
-                    patch_10.set_color(HIGHLIGHT_COMPLEMENT)
-                    patch_10.set_alpha(0.7)
-
-                patch_11 = v.get_patch_by_id('11')
-                if patch_11:
-                     patch_11.set_color(PALETTE[1])
-                     patch_11.set_alpha(0.5)
-
-                plt.title(f"Complement of Set {a_idx+1} = U - Set {a_idx+1}")
-                plt.show()
-
-        elif choice == 8: # Exit
-            print(f"\n{YELLOW}Exiting...{RESET}")
-            print(f"{YELLOW}Thank you for using the Set Theory Visualizer!{RESET}")
-            plt.close('all')
-            break
-        else:
-            print(f"{RED}Invalid choice. Please enter a number between 1 and 8.{RESET}")
+        except ValueError:
+            print(f"{RED}Invalid input. Please enter a number for the choice.{RESET}")
+        except Exception as e:
+            print(f"{RED}An unexpected error occurred: {e}{RESET}")
+        finally:
+            PROFILER.end()
+    return 0
 
-    except ValueError:
-        print(f"{RED}Invalid input. Please enter a number for the choice.{RESET}")
-    except Exception as e:
-        print(f"{RED}An unexpected error occurred: {e}{RESET}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Benchmark suite for SetViz.
+
+Times the real code paths of app.py (input parsing, the six operation helpers, Venn
+region computation and headless plotting, menu redraws) over a range of set sizes and
+set counts, writes the timings as JSON and optionally compares them with a stored
+baseline. A case that is slower than the baseline by more than --threshold fails the run.
+
+    python benchmark.py --sizes 1000,100000 --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import app
+from app import CYAN, GREEN, RED, YELLOW, BOLD, RESET
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+DEFAULT_SET_COUNTS = "2,3,5,12"
+SUITES = ("parse", "ops", "regions", "plot", "menu")
+
+
+# --- Data Generation ---
+
+def make_sets(size, count, seed=0):
+    """Returns (universal_set, sets): `count` random sets of ~`size` elements drawn from
+    a universe of 2 * size integers, so every Venn region is populated."""
+    universe = 2 * size
+    sets = []
+    for i in range(count):
+        if app.numpy_available():
+            mask = app.np.random.default_rng(seed + i).random(universe) < 0.5
+            sets.append(set(app.np.flatnonzero(mask).tolist()))
+        else:
+            sets.append(set(random.Random(seed + i).sample(range(universe), size)))
+    return set(range(universe)), sets
+
+def encode(engine, universal_set, sets):
+    if engine == "bitmap":
+        return app.encode_sets(universal_set, sets)
+    return universal_set, sets
+
+
+# --- Timing ---
+
+def measure(func, repeat):
+    """Runs `func` `repeat` times with an empty result cache; returns timing stats."""
+    times = []
+    for _ in range(repeat):
+        app.RESULT_CACHE.clear()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "repeat": repeat}
+
+def operation_cases(universal_set, sets):
+    a, b = sets[0], sets[1]
+    return {
+        "union": lambda: app.union(sets),
+        "intersection": lambda: app.intersection(sets),
+        "difference": lambda: app.difference(a, b),
+        "symmetric_difference": lambda: app.symmetric_difference(a, b),
+        "subset": lambda: app.check_subset(a, b),
+        "complement": lambda: app.complement(universal_set, a),
+    }
+
+def plot_kind(count):
+    """Name of the diagram plot_sets() draws for `count` sets."""
+    if count == 2: return "venn2"
+    if count == 3: return "venn3"
+    if count <= 6 and app.supervenn_available(): return "supervenn"
+    return "matrix"
+
+def run_suites(sizes, set_counts, engines, suites, repeat, output_dir, log=print):
+    """Runs the selected suites; returns {case name: timing stats}."""
+    results = {}
+    plotting = "plot" in suites
+    if plotting:
+        try:
+            app.enable_headless(output_dir, "png")
+            app.load_plotting()
+        except ImportError as e:
+            log(f"{YELLOW}Skipping plot suite: {e}{RESET}")
+            plotting = False
+
+    def record(name, func):
+        results[name] = measure(func, repeat)
+        log(f"  {name:<48} {results[name]['median'] * 1000:>12.3f} ms")
+
+    for size in sizes:
+        log(f"{BOLD}{CYAN}Size {size:,}{RESET}")
+        if "parse" in suites:
+            text = " ".join(map(str, range(size)))
+            record(f"parse/n={size}", lambda: app.parse_set_input(text))
+        for count in set_counts:
+            raw_universe, raw_sets = make_sets(size, count)
+            for engine in engines:
+                if engine in ("bitmap", "sharded") and not app.numpy_available():
+                    continue
+                app.SHARD_SETTINGS["enabled"] = engine == "sharded"
+                universal_set, sets = encode(engine, raw_universe, raw_sets)
+                labels = [f"Set {i + 1}" for i in range(count)]
+                prefix = f"{engine}/n={size}/sets={count}"
+                if "ops" in suites:
+                    for op, func in operation_cases(universal_set, sets).items():
+                        record(f"ops/{op}/{prefix}", func)
+                if "regions" in suites:
+                    record(f"regions/partition/{prefix}", lambda: app.partition_regions(sets))
+                    record(f"regions/count/{prefix}", lambda: app.count_regions(sets))
+                if plotting:
+                    result = app.union(sets)
+                    def plot():
+                        with contextlib.redirect_stdout(io.StringIO()): # Hide "Saved diagram to ..."
+                            app.plot_sets(sets, "Union", result, labels=labels)
+                    record(f"plot/{plot_kind(count)}/{prefix}", plot)
+                if "menu" in suites:
+                    def redraw():
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            app.display_menu_unicode_color(sets, universal_set, labels)
+                    record(f"menu/{prefix}", redraw)
+    return results
+
+
+# --- Baseline Comparison ---
+
+def compare(results, baseline, threshold, min_seconds):
+    """Returns a list of (name, baseline seconds, current seconds, ratio) regressions.
+
+    Cases faster than `min_seconds` in both runs are ignored as timer noise."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        before, after = previous["median"], current["median"]
+        if max(before, after) < min_seconds:
+            continue
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append((name, before, after, ratio))
+    return regressions
+
+
+# --- Main ---
+
+def parse_int_list(text):
+    return [int(float(item)) for item in text.split(",") if item.strip()]
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark SetViz set operations, regions, parsing and rendering.")
+    parser.add_argument("--sizes", type=parse_int_list, default=parse_int_list(DEFAULT_SIZES),
+                        help=f"Comma-separated set sizes, e.g. 1e3,1e5,1e7 (default {DEFAULT_SIZES}).")
+    parser.add_argument("--sets", type=parse_int_list, default=parse_int_list(DEFAULT_SET_COUNTS),
+                        help=f"Comma-separated numbers of sets, each >= 2 (default {DEFAULT_SET_COUNTS}).")
+    parser.add_argument("--engine", choices=("set", "bitmap", "sharded", "both"), default="set",
+                        help="Set engine(s) to benchmark; 'sharded' is Python sets with --sharded execution.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for the sharded engine (default: one per core).")
+    parser.add_argument("--suite", action="append", choices=SUITES, dest="suites",
+                        help="Suite to run (repeatable, default all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with a JSON file written by --output.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown versus the baseline, as a fraction (default 0.25 = 25%%).")
+    parser.add_argument("--min-seconds", type=float, default=0.001,
+                        help="Ignore cases faster than this in both runs when comparing.")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if any(count < 2 for count in args.sets):
+        print(f"{RED}Error: --sets values must be at least 2.{RESET}")
+        return 2
+    engines = ("set", "bitmap") if args.engine == "both" else (args.engine,)
+    app.SHARD_SETTINGS["workers"] = args.workers
+    suites = args.suites or SUITES
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = run_suites(args.sizes, args.sets, engines, suites, args.repeat, output_dir)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": app.np.__version__ if app.numpy_available() else None,
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"{GREEN}Wrote {len(results)} results to {args.output}{RESET}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        shared = sum(1 for name in results if name in baseline)
+        if regressions:
+            print(f"{RED}{len(regressions)} of {shared} cases regressed by more than {args.threshold:.0%}:{RESET}")
+            for name, before, after, ratio in regressions:
+                print(f"  {name:<48} {before * 1000:>10.3f} ms -> {after * 1000:>10.3f} ms ({ratio:.2f}x)")
+            return 1
+        print(f"{GREEN}No regressions in {shared} cases compared with {args.baseline}.{RESET}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
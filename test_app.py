@@ -0,0 +1,101 @@
+import pytest
+
+import app
+
+
+def test_edit_then_query_through_cache():
+    sets = [{1, 2, 3}, {3, 4}, {5}]
+    universe = {1, 2, 3, 4, 5, 9}
+    live = app.track_sets(sets)
+    try:
+        assert app.run_expression("(S1 | S2 | S3) - S1", sets, universe)[0] == {4, 5}
+        assert app.run_expression("~(S1 | S2 | S3)", sets, universe)[0] == {9}
+        assert app.run_expression("S1 & S2", sets, universe)[0] == {3}
+        live.add(1, [9])
+        live.remove(0, [3])
+        assert app.run_expression("(S1 | S2 | S3) - S1", sets, universe)[0] == {3, 4, 5, 9}
+        assert app.run_expression("~(S1 | S2 | S3)", sets, universe)[0] == set()
+        assert app.run_expression("S1 & S2", sets, universe)[0] == set()
+        assert app.count_regions(sets) == {0b01: 2, 0b10: 3, 0b100: 1}
+    finally:
+        app.untrack_sets(sets)
+
+
+def test_sharded_diagram_regions_use_maintained_aggregates(monkeypatch):
+    sets = [set(range(0, 3000)), set(range(1000, 4000)), set(range(2000, 5000, 2))]
+    monkeypatch.setitem(app.SHARD_SETTINGS, "enabled", True)
+    monkeypatch.setitem(app.SHARD_SETTINGS, "workers", 1)
+    monkeypatch.setitem(app.SHARD_SETTINGS, "min_elements", 1)
+    live = app.track_sets(sets)
+    try:
+        live.add(2, [1])
+        monkeypatch.setattr(app, "sharded_regions", lambda *args, **kwargs: pytest.fail("region pass re-run"))
+        sizes, texts = app.region_sizes_and_labels(sets)
+        assert sum(sizes.values()) == len(set().union(*sets))
+        assert sizes[0b101] == 1 and texts[0b101] == "{1}"
+    finally:
+        app.untrack_sets(sets)
+
+
+def test_batch_reports_malformed_jobs_per_job(tmp_path):
+    pytest.importorskip("matplotlib")
+    jobs = [{"operation": 3}, "union", {"operation": "nope"}, {"operation": "union", "output": "u.png"}]
+    outcomes = app.render_batch(jobs, {1, 2, 3}, [{1, 2}, {2, 3}], ["A", "B"], str(tmp_path), workers=1)
+    assert outcomes[0] == (None, "TypeError: 'operation' must be a string, not int")
+    assert outcomes[1] == (None, "TypeError: a job must be a JSON object, not str")
+    assert outcomes[2] == (None, "ValueError: Unknown operation: nope")
+    assert outcomes[3] == (str(tmp_path / "u.png"), None)
+    assert not app.RENDER_SETTINGS["headless"] and not app._worker_state
+
+
+@pytest.mark.parametrize("option", ["--workers", "--sketch-size", "--max-elements"])
+def test_counts_below_one_are_usage_errors(option, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        app.main([option, "0"])
+    assert exit_info.value.code == 2
+    assert f"{option} must be at least 1" in capsys.readouterr().err
+
+
+def test_summary_limits_must_be_positive():
+    with pytest.raises(ValueError):
+        app.configure_summary("print", max_elements=0)
+    assert app.SUMMARY_LIMITS["print"] == (1000, 8000)
+
+
+def test_cached_results_cannot_be_mutated():
+    a, b, universe = {1, 2, 3}, {3, 4}, {1, 2, 3, 4, 5}
+    results = [app.union([a, b]), app.intersection([a, b]), app.difference(a, b),
+               app.symmetric_difference(a, b), app.complement(universe, a)]
+    for result in results:
+        with pytest.raises(AttributeError):
+            result.add(99)
+    assert app.union([a, b]) == {1, 2, 3, 4}
+    assert app.difference(a, b) == {1, 2}
+    regions = app.partition_regions([a, b])
+    with pytest.raises(TypeError):
+        regions[0b11] = set()
+    assert app.partition_regions([a, b]) == {0b01: {1, 2}, 0b10: {4}, 0b11: {3}}
+
+
+def test_tracked_results_are_read_only_views():
+    sets = [{1, 2, 3}, {3, 4}]
+    live = app.track_sets(sets)
+    try:
+        union = app.union(sets)
+        with pytest.raises(AttributeError):
+            union.add(99)
+        with pytest.raises(TypeError):
+            app.count_regions(sets)[0b01] = 0
+        with pytest.raises(AttributeError):
+            app.partition_regions(sets)[0b11].add(99)
+        live.add(1, [5])
+        live.remove(1, [3])
+        assert union == {1, 2, 3, 4, 5}
+        assert app.partition_regions(sets) == {0b01: {1, 2, 3}, 0b10: {4, 5}}
+        assert app.count_regions(sets) == {0b01: 3, 0b10: 2}
+        assert app.intersection(sets) == set()
+        live.add(0, [4])
+        assert app.intersection(sets) == {4}
+    finally:
+        assert app.untrack_sets(sets)
+    assert app.live_aggregates(sets) is None and not app.untrack_sets(sets)